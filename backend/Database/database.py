@@ -1,13 +1,17 @@
 import sqlite3
-import pandas as pd
 import os
 import sys
+import time
+import threading
 from contextlib import contextmanager
+from datetime import timedelta
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from functions.normalize_text import normalize_text
-from functions.load_data import load_data_pandas
+from functions.load_data import pick_source_file, iter_source_chunks
+from Database.ingest import bulk_load, incremental_load, has_data, source_changed, record_source, ensure_rollups
+from Database.pool import ConnectionPool
+from Database.planner import plan_range, segments_sql
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,158 +20,359 @@ EXCEL_FILE = os.getenv("EXCEL_FILE")
 PARQUET_FILE = os.getenv("PARQUET_FILE")
 SQLITE_DB = os.getenv("SQLITE_DB")
 USE_DATABASE = os.getenv("USE_DATABASE", "True").lower() == "true"
+USE_PREFIX_INDEX = os.getenv("USE_PREFIX_INDEX", "True").lower() == "true"
+# Seconds a worker waits for another worker's ingest to release the write lock
+INGEST_LOCK_TIMEOUT = float(os.getenv("INGEST_LOCK_TIMEOUT", "600"))
+# Pandas mode: memory-mapped column snapshot, rebuilt when the extract changes
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "column_snapshot")
+# Ranges longer than this get a per-month breakdown instead of one row per day
+MONTHLY_BREAKDOWN_THRESHOLD_DAYS = int(os.getenv("MONTHLY_BREAKDOWN_THRESHOLD_DAYS", "92"))
 # -----------------------
-# Helpers: normalize, load
+# Ingest notifications
 # -----------------------
 
+_ingest_listeners = []
 
-def setup_sqlite_database(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, SQLITE_DB=SQLITE_DB):
-    """Create SQLite database with optimized schema and indexes"""
+
+def register_ingest_listener(callback):
+    """callback(first_date) runs after each load; first_date is None for a full rebuild"""
+    _ingest_listeners.append(callback)
+
+
+def notify_ingest(first_date):
+    """Drop derived in-memory state that may cover the (re)loaded days"""
+    reset_prefix_index()
+    for callback in _ingest_listeners:
+        callback(first_date)
+
+
+def get_families_from_db(conn):
+    cursor = conn.execute('SELECT DISTINCT famille_norm FROM consumption ORDER BY famille_norm')
+    return [row[0] for row in cursor.fetchall()]
+
+
+def setup_sqlite_database(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, SQLITE_DB=SQLITE_DB, incremental=False):
+    """Create SQLite database with optimized schema and indexes.
+
+    With incremental=True an already populated database is only touched when
+    the source extract changed, and then only rows from the watermark day on
+    are (re)inserted.
+    """
     print("Setting up SQLite database...")
-    
-    # Load data from Excel/Parquet
-    if os.path.exists(PARQUET_FILE):
-        print("Loading from parquet...")
-        df = pd.read_parquet(PARQUET_FILE)
-    else:
-        print("Loading from Excel...")
-        df = pd.read_excel(EXCEL_FILE)
-        df.to_parquet(PARQUET_FILE, index=False)
-
-    # Clean and normalize data
-    df['DATE_CONSO'] = pd.to_datetime(df['DATE_CONSO'], errors='coerce', dayfirst=True).dt.date
-    df['FAMILLE_NORM'] = df['FAMILLE'].astype(str).apply(normalize_text)
-    df['QTE'] = pd.to_numeric(df['QTE'].astype(str).str.replace(',', '.'), errors='coerce')
-    df = df.dropna(subset=['DATE_CONSO', 'FAMILLE_NORM', 'QTE']).reset_index(drop=True)
-    
-    # Create SQLite database
-    conn = sqlite3.connect(SQLITE_DB)
-    
-    # Create table with optimized schema
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS consumption (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date_conso DATE NOT NULL,
-            famille_norm TEXT NOT NULL,
-            famille_original TEXT,
-            qte REAL NOT NULL
-        )
-    ''')
-    
-    # Clear existing data
-    conn.execute('DELETE FROM consumption')
-    
-    # Insert data
-    for _, row in df.iterrows():
-        conn.execute('''
-            INSERT INTO consumption (date_conso, famille_norm, famille_original, qte)
-            VALUES (?, ?, ?, ?)
-        ''', (row['DATE_CONSO'], row['FAMILLE_NORM'], 
-              row.get('FAMILLE', ''), row['QTE']))
-    
-    # Create indexes for fast queries
-    conn.execute('CREATE INDEX IF NOT EXISTS idx_date_famille ON consumption(date_conso, famille_norm)')
-    conn.execute('CREATE INDEX IF NOT EXISTS idx_famille ON consumption(famille_norm)')
-    conn.execute('CREATE INDEX IF NOT EXISTS idx_date ON consumption(date_conso)')
-    
-    conn.commit()
-    conn.close()
-    
-    print(f"Database setup complete. Total records: {len(df)}")
-    return df['FAMILLE_NORM'].unique().tolist()
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(SQLITE_DB)
-    conn.row_factory = sqlite3.Row  # Enable column access by name
+    conn = sqlite3.connect(SQLITE_DB, timeout=INGEST_LOCK_TIMEOUT)
     try:
-        yield conn
+        conn.execute('PRAGMA journal_mode = WAL')
+        if incremental and has_data(conn):
+            ensure_rollups(conn)
+            source = pick_source_file(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE)
+            if source_changed(conn, source):
+                # Another worker may be loading the same extract: take the write lock, then look again
+                conn.execute('BEGIN IMMEDIATE')
+                source = pick_source_file(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE)
+                if source_changed(conn, source):
+                    chunks = iter_source_chunks(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE)
+                    inserted, first_date = incremental_load(conn, chunks, record_path=PARQUET_FILE)
+                    if inserted:
+                        notify_ingest(first_date)
+                    return get_families_from_db(conn)
+                conn.rollback()
+            print("Source unchanged since last load, skipping ingest")
+            return get_families_from_db(conn)
+
+        # Bulk load into SQLite (single transaction, indexes rebuilt after load);
+        # chunks are written as they are read, so the extract is never held whole
+        inserted = bulk_load(conn, iter_source_chunks(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE))
+        record_source(conn, PARQUET_FILE)
+        notify_ingest(None)
+        families = get_families_from_db(conn)
     finally:
         conn.close()
 
-def query_consumption_data(start_date, end_date, famille, USE_DATABASE=USE_DATABASE):
-    """Fast database query for consumption data"""
+    print(f"Database setup complete. Total records: {inserted}")
+    return families
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool of read-only connections, opened on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(SQLITE_DB)
+    return _pool
+
+
+@contextmanager
+def get_db_connection():
+    """Context manager for pooled read-only database connections"""
+    with get_pool().connection() as conn:
+        yield conn
+
+# -----------------------
+# Prefix-sum index
+# -----------------------
+
+_prefix_index = None
+_prefix_index_lock = threading.Lock()
+
+
+def get_prefix_index():
+    """In-memory prefix-sum index over the daily rollup, built on first use"""
+    global _prefix_index
+    if not USE_PREFIX_INDEX:
+        return None
+    if _prefix_index is None:
+        with _prefix_index_lock:
+            if _prefix_index is None:
+                from Database.prefix_index import PrefixSumIndex
+                build_start = time.time()
+                with get_db_connection() as conn:
+                    _prefix_index = PrefixSumIndex.from_sqlite(conn)
+                build_time = round((time.time() - build_start) * 1000, 2)
+                print(f"Prefix index built for {len(_prefix_index.series)} families in {build_time}ms")
+    return _prefix_index
+
+
+def reset_prefix_index():
+    """Drop the index so the next lookup rebuilds it from fresh data"""
+    global _prefix_index
+    with _prefix_index_lock:
+        _prefix_index = None
+
+
+def fetch_sample_rows(conn, start_date, end_date, famille, limit=100):
+    rows_cursor = conn.execute('''
+        SELECT date_conso, famille_norm, qte 
+        FROM consumption 
+        WHERE date_conso BETWEEN ? AND ? 
+        AND famille_norm = ?
+        ORDER BY date_conso
+        LIMIT ?
+    ''', (start_date, end_date, famille, limit))
+    return [
+        {
+            'DATE_CONSO': row['date_conso'],
+            'FAMILLE_NORM': row['famille_norm'],
+            'QTE': float(row['qte'])
+        }
+        for row in rows_cursor.fetchall()
+    ]
+
+
+EMPTY_AGGREGATES = {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}
+
+
+def breakdown_granularity(start_date, end_date, granularity=None):
+    """'day' or 'month': explicit choice, else by range length"""
+    if granularity in ('day', 'month'):
+        return granularity
+    days = (end_date - start_date).days + 1
+    return 'month' if days > MONTHLY_BREAKDOWN_THRESHOLD_DAYS else 'day'
+
+
+def rollup_numbers(conn, start_date, end_date, familles, granularity='day'):
+    """({famille: sum/mean/min/max/count}, {famille: breakdown rows}) from one scan of the rollups (familles None = all).
+
+    The breakdown is per day, or per month from whole months plus edge days;
+    the aggregates are folded from the same rows instead of a second UNION pass.
+    """
+    if granularity == 'month':
+        segments = plan_range(start_date, end_date)
+        select = 'substr({key}, 1, 7) AS period, qte_sum, qte_count, qte_min, qte_max'
+    else:
+        segments = [('day', start_date.isoformat(), end_date.isoformat())] if start_date <= end_date else []
+        select = '{key} AS period, qte_sum, qte_count, qte_min, qte_max'
+    if not segments:
+        return {}, {}
+    union, params = segments_sql(segments, familles, select)
+    cursor = conn.execute(f'''
+        SELECT famille_norm, period, SUM(qte_sum), SUM(qte_count), MIN(qte_min), MAX(qte_max)
+        FROM ({union})
+        GROUP BY famille_norm, period
+        ORDER BY famille_norm, period
+    ''', params)
+    aggregates, breakdown = {}, {}
+    for famille, period, total, entries, low, high in cursor.fetchall():
+        total, entries, low, high = float(total), int(entries), float(low), float(high)
+        breakdown.setdefault(famille, []).append({'period': period, 'total': total, 'entries': entries})
+        famille_aggregates = aggregates.get(famille)
+        if famille_aggregates is None:
+            aggregates[famille] = {'sum': total, 'min': low, 'max': high, 'count': entries}
+        else:
+            famille_aggregates['sum'] += total
+            famille_aggregates['count'] += entries
+            famille_aggregates['min'] = min(famille_aggregates['min'], low)
+            famille_aggregates['max'] = max(famille_aggregates['max'], high)
+    for famille_aggregates in aggregates.values():
+        count = famille_aggregates['count']
+        famille_aggregates['mean'] = famille_aggregates['sum'] / count if count else 0.0
+    return aggregates, breakdown
+
+
+def query_consumption_data(start_date, end_date, famille, USE_DATABASE=USE_DATABASE, include_rows=False, granularity=None):
+    """Fast query for consumption data, from SQLite or the in-memory store (same result shape).
+
+    The breakdown is per day, or per month ('YYYY-MM' periods) for long ranges;
+    sample rows (first 100 in date order) are only fetched when include_rows is set.
+    """
+    granularity = breakdown_granularity(start_date, end_date, granularity)
+
     if not USE_DATABASE:
-        # Fallback to pandas
-        df_filtered = df_data[
-            (df_data['DATE_CONSO'] >= start_date) &
-            (df_data['DATE_CONSO'] <= end_date) &
-            (df_data['FAMILLE_NORM'] == famille)
-        ].copy()
-        return df_filtered
-    
-    # Rest of your database code remains the same...
-    with get_db_connection() as conn:
-        # Get aggregated data in one query
-        cursor = conn.execute('''
-            SELECT 
-                SUM(qte) as total_sum,
-                AVG(qte) as mean_val,
-                MIN(qte) as min_val,
-                MAX(qte) as max_val,
-                COUNT(*) as count_val
-            FROM consumption 
-            WHERE date_conso BETWEEN ? AND ? 
-            AND famille_norm = ?
-        ''', (start_date, end_date, famille))
-        
-        agg_result = cursor.fetchone()
-
-        aggregates = {
-            'sum': float(agg_result['total_sum']) if agg_result['total_sum'] is not None else 0.0,
-            'mean': float(agg_result['mean_val']) if agg_result['mean_val'] is not None else 0.0,
-            'min': float(agg_result['min_val']) if agg_result['min_val'] is not None else 0.0,
-            'max': float(agg_result['max_val']) if agg_result['max_val'] is not None else 0.0,
-            'count': int(agg_result['count_val']) if agg_result['count_val'] is not None else 0
+        store = get_data_source().store
+        if famille not in store:
+            return {'aggregates': dict(EMPTY_AGGREGATES), 'granularity': granularity, 'breakdown': [], 'sample_rows': []}
+        return {
+            'aggregates': store.aggregates(famille, start_date, end_date),
+            'granularity': granularity,
+            'breakdown': store.breakdown(famille, start_date, end_date, granularity),
+            'sample_rows': store.sample_rows(famille, start_date, end_date) if include_rows else []
         }
-        
-        # Get daily breakdown for ranges if needed
-        daily_cursor = conn.execute('''
-            SELECT 
-                date_conso,
-                SUM(qte) as daily_total,
-                COUNT(*) as daily_count
-            FROM consumption 
-            WHERE date_conso BETWEEN ? AND ? 
-            AND famille_norm = ?
-            GROUP BY date_conso
-            ORDER BY date_conso
-        ''', (start_date, end_date, famille))
-        
-        daily_results = daily_cursor.fetchall()
-        
-        # Get sample rows (limited)
-        rows_cursor = conn.execute('''
-            SELECT date_conso, famille_norm, qte 
-            FROM consumption 
-            WHERE date_conso BETWEEN ? AND ? 
-            AND famille_norm = ?
-            ORDER BY date_conso
-            LIMIT 100
-        ''', (start_date, end_date, famille))
-        
-        sample_rows = rows_cursor.fetchall()
-        
+
+    # Aggregates and breakdown straight from the in-memory index
+    index = get_prefix_index()
+    if index is not None and famille in index:
+        sample_rows = []
+        if include_rows:
+            with get_db_connection() as conn:
+                sample_rows = fetch_sample_rows(conn, start_date, end_date, famille)
         return {
-            'aggregates': aggregates,
-            'daily_breakdown': [
-                {
-                    'date': row['date_conso'],
-                    'total': float(row['daily_total']),
-                    'entries': int(row['daily_count'])
-                }
-                for row in daily_results
-            ],
-            'sample_rows': [
-                {
-                    'DATE_CONSO': row['date_conso'],
-                    'FAMILLE_NORM': row['famille_norm'],
-                    'QTE': float(row['qte'])
-                }
-                for row in sample_rows
-            ]
+            'aggregates': index.aggregates(famille, start_date, end_date),
+            'granularity': granularity,
+            'breakdown': index.breakdown(famille, start_date, end_date, granularity),
+            'sample_rows': sample_rows
+        }
+
+    with get_db_connection() as conn:
+        aggregates, breakdown = rollup_numbers(conn, start_date, end_date, [famille], granularity)
+        # Get sample rows (limited) only when asked for
+        sample_rows = fetch_sample_rows(conn, start_date, end_date, famille) if include_rows else []
+
+    return {
+        'aggregates': aggregates.get(famille, dict(EMPTY_AGGREGATES)),
+        'granularity': granularity,
+        'breakdown': breakdown.get(famille, []),
+        'sample_rows': sample_rows
+    }
+
+
+def query_consumption_by_famille(start_date, end_date, familles=None, USE_DATABASE=USE_DATABASE, granularity=None):
+    """Several familles (None = all) in one grouped pass: {famille: {'aggregates', 'breakdown'}} plus the granularity"""
+    granularity = breakdown_granularity(start_date, end_date, granularity)
+
+    if not USE_DATABASE:
+        # One pair of binary searches per famille in the in-memory store
+        store = get_data_source().store
+        present = [famille for famille in (familles if familles is not None else store.familles) if famille in store]
+        aggregates = {famille: store.aggregates(famille, start_date, end_date) for famille in present}
+        breakdown = {famille: store.breakdown(famille, start_date, end_date, granularity) for famille in present}
+    else:
+        index = get_prefix_index()
+        if index is not None and familles is not None and all(famille in index for famille in familles):
+            # O(1) per famille from the in-memory index
+            aggregates = {famille: index.aggregates(famille, start_date, end_date) for famille in familles}
+            breakdown = {famille: index.breakdown(famille, start_date, end_date, granularity) for famille in familles}
+        else:
+            with get_db_connection() as conn:
+                aggregates, breakdown = rollup_numbers(conn, start_date, end_date, familles, granularity)
+
+    names = familles if familles is not None else sorted(set(aggregates) | set(breakdown))
+    return {
+        'granularity': granularity,
+        'familles': {
+            famille: {
+                'aggregates': aggregates.get(famille, dict(EMPTY_AGGREGATES)),
+                'breakdown': breakdown.get(famille, [])
+            }
+            for famille in names
         }
+    }
+
+# -----------------------
+# Batch range index
+# -----------------------
+
+def merge_ranges(ranges):
+    """Sort (start, end) date ranges and merge the overlapping or adjacent ones"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+# SQLite caps a compound SELECT at 500 terms (and old builds at 999 parameters, 3 per span)
+BATCH_SPANS_PER_QUERY = 300
+
+
+def read_daily_spans(conn, spans):
+    """Daily rollup rows of {famille: [(start, end), ...]}, ordered by famille and date.
+
+    One UNION ALL per BATCH_SPANS_PER_QUERY spans; the familles are walked in
+    sorted order so the concatenated results stay ordered.
+    """
+    terms = [(famille, start, end) for famille in sorted(spans) for start, end in spans[famille]]
+    rows = []
+    for first in range(0, len(terms), BATCH_SPANS_PER_QUERY):
+        parts, params = [], []
+        for famille, start, end in terms[first:first + BATCH_SPANS_PER_QUERY]:
+            parts.append('''SELECT famille_norm, date_conso, qte_sum, qte_count, qte_min, qte_max
+            FROM daily_consumption WHERE famille_norm = ? AND date_conso BETWEEN ? AND ?''')
+            params.extend((famille, start.isoformat(), end.isoformat()))
+        rows.extend(conn.execute(
+            '\nUNION ALL\n'.join(parts) + '\nORDER BY famille_norm, date_conso', params
+        ).fetchall())
+    return rows
+
+
+def load_batch_index(ranges_by_famille, USE_DATABASE=USE_DATABASE):
+    """Range index covering every {famille: [(start, end), ...]} of a batch; returns (index, spans read).
+
+    Each merged span is read once (see read_daily_spans) and the result
+    answers aggregates()/breakdown() exactly like the prefix index.
+    """
+    from Database.prefix_index import PrefixSumIndex
+    spans = {famille: merge_ranges(ranges) for famille, ranges in ranges_by_famille.items() if ranges}
+    if not spans:
+        return PrefixSumIndex({}), 0
+
+    if USE_DATABASE:
+        index = get_prefix_index()
+        if index is not None:
+            # Whole history already in memory
+            return index, 0
+        with get_db_connection() as conn:
+            rows = read_daily_spans(conn, spans)
+    else:
+        # The in-memory store already answers any range with two binary searches
+        return get_data_source().store, 0
+    span_count = sum(len(famille_spans) for famille_spans in spans.values())
+    return PrefixSumIndex.from_daily_rows(rows), span_count
+
+def load_column_store(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, SNAPSHOT_DIR=SNAPSHOT_DIR):
+    """Map the column snapshot if it matches the extract, otherwise rebuild it from the source"""
+    from Database.memory_store import ColumnStore, snapshot_signature
+    start = time.time()
+    store = ColumnStore.load(SNAPSHOT_DIR, snapshot_signature(PARQUET_FILE, EXCEL_FILE))
+    if store is not None:
+        print(f"Column store mapped from {SNAPSHOT_DIR}: {len(store)} rows in {(time.time() - start) * 1000:.2f}ms")
+        return store
+
+    store = ColumnStore.from_chunks(iter_source_chunks(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE))
+    print(f"Column store: {len(store)} rows, {store.nbytes / 1e6:.1f} MB")
+    # Signed after loading: a first Excel load also writes the parquet cache
+    try:
+        store.save(SNAPSHOT_DIR, snapshot_signature(PARQUET_FILE, EXCEL_FILE))
+        print(f"Column snapshot written to {SNAPSHOT_DIR}")
+    except OSError as e:
+        print(f"Could not write column snapshot: {e}")
+    return store
+
 
 # Initialize data source
 def initialize_data_source(USE_DATABASE=USE_DATABASE, PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, SQLITE_DB=SQLITE_DB):
@@ -175,15 +380,85 @@ def initialize_data_source(USE_DATABASE=USE_DATABASE, PARQUET_FILE=PARQUET_FILE,
         if not os.path.exists(SQLITE_DB):
             available_families = sorted(setup_sqlite_database(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, SQLITE_DB=SQLITE_DB))
         else:
-            # Get families from existing database
-            with get_db_connection() as conn:
-                cursor = conn.execute('SELECT DISTINCT famille_norm FROM consumption ORDER BY famille_norm')
-                available_families = [row[0] for row in cursor.fetchall()]
-        df_data = None  # Don't load into memory
+            # Open the existing database; only ingest if the extract changed
+            available_families = sorted(setup_sqlite_database(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, SQLITE_DB=SQLITE_DB, incremental=True))
+        store = None  # Don't load into memory
     else:
-        df_data = load_data_pandas()
-        available_families = sorted(df_data['FAMILLE_NORM'].unique().tolist())
-    return available_families, df_data
+        store = load_column_store(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE)
+        available_families = store.familles
+    return available_families, store
+
+
+class DataSource:
+    """Process-wide handle on the loaded data, shared by every module"""
+
+    def __init__(self, USE_DATABASE, available_families, store):
+        self.USE_DATABASE = USE_DATABASE
+        self.available_families = available_families
+        self.store = store  # ColumnStore in pandas mode, None in database mode
+
+    def refresh_families(self, first_date=None):
+        """Ingest hook: pick up families that appeared in a new extract"""
+        if self.USE_DATABASE:
+            with get_db_connection() as conn:
+                self.available_families = get_families_from_db(conn)
+
 
-available_families, df_data = initialize_data_source()
-setup_sqlite_database(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, SQLITE_DB=SQLITE_DB)
\ No newline at end of file
+_data_source = None
+_data_source_lock = threading.Lock()
+_data_source_mode = USE_DATABASE
+
+
+def configure_data_source(USE_DATABASE):
+    """Set the mode used when the data source gets built, without building it"""
+    global _data_source_mode
+    _data_source_mode = USE_DATABASE
+
+
+def data_source_ready():
+    return _data_source is not None
+
+
+def get_data_source(USE_DATABASE=None):
+    """Shared data source, built once on first call"""
+    global _data_source
+    if USE_DATABASE is None:
+        USE_DATABASE = _data_source_mode
+    if _data_source is None:
+        with _data_source_lock:
+            if _data_source is None:
+                init_start = time.time()
+                available_families, store = initialize_data_source(USE_DATABASE=USE_DATABASE)
+                data_source = DataSource(USE_DATABASE, available_families, store)
+                register_ingest_listener(data_source.refresh_families)
+                if USE_DATABASE:
+                    get_prefix_index()
+                init_time = round((time.time() - init_start) * 1000, 2)
+                print(f"Data source ready in {init_time}ms ({len(available_families)} families)")
+                _data_source = data_source
+    return _data_source
+
+
+_ingest_lock = threading.Lock()
+
+
+def refresh_data_source():
+    """Load a new extract into the running process (POST /ingest).
+
+    Database mode runs the incremental ingest, which notifies the ingest
+    listeners when rows were added. Pandas mode maps or rebuilds the column
+    store and swaps it in.
+    """
+    data_source = get_data_source()
+    with _ingest_lock:
+        refresh_start = time.time()
+        if data_source.USE_DATABASE:
+            setup_sqlite_database(incremental=True)
+        else:
+            store = load_column_store()
+            data_source.store = store
+            data_source.available_families = store.familles
+            notify_ingest(None)
+        refresh_time = round((time.time() - refresh_start) * 1000, 2)
+    print(f"Ingest refresh done in {refresh_time}ms")
+    return {"families": len(data_source.available_families), "ingest_ms": refresh_time}
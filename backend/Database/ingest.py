@@ -0,0 +1,326 @@
+import time
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "50000"))
+
+# -----------------------
+# Schema
+# -----------------------
+
+CREATE_CONSUMPTION_TABLE = '''
+    CREATE TABLE IF NOT EXISTS consumption (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date_conso DATE NOT NULL,
+        famille_norm TEXT NOT NULL,
+        famille_original TEXT,
+        qte REAL NOT NULL
+    )
+'''
+
+CONSUMPTION_INDEXES = [
+    ('idx_date_famille', 'CREATE INDEX IF NOT EXISTS idx_date_famille ON consumption(date_conso, famille_norm)'),
+    ('idx_famille', 'CREATE INDEX IF NOT EXISTS idx_famille ON consumption(famille_norm)'),
+    ('idx_date', 'CREATE INDEX IF NOT EXISTS idx_date ON consumption(date_conso)'),
+]
+
+CREATE_DAILY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS daily_consumption (
+        famille_norm TEXT NOT NULL,
+        date_conso DATE NOT NULL,
+        qte_sum REAL NOT NULL,
+        qte_count INTEGER NOT NULL,
+        qte_min REAL NOT NULL,
+        qte_max REAL NOT NULL,
+        qte_sumsq REAL NOT NULL,
+        PRIMARY KEY (famille_norm, date_conso)
+    ) WITHOUT ROWID
+'''
+
+# Coarser tier rolled up from the daily table: month = 'YYYY-MM'
+CREATE_MONTHLY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS monthly_consumption (
+        famille_norm TEXT NOT NULL,
+        month TEXT NOT NULL,
+        qte_sum REAL NOT NULL,
+        qte_count INTEGER NOT NULL,
+        qte_min REAL NOT NULL,
+        qte_max REAL NOT NULL,
+        qte_sumsq REAL NOT NULL,
+        PRIMARY KEY (famille_norm, month)
+    ) WITHOUT ROWID
+'''
+
+INSERT_CONSUMPTION = '''
+    INSERT INTO consumption (date_conso, famille_norm, famille_original, qte)
+    VALUES (?, ?, ?, ?)
+'''
+
+# -----------------------
+# Daily rollup
+# -----------------------
+
+def rebuild_daily_rollup(conn, from_date=None):
+    """Recompute daily_consumption from the raw rows (all days, or from_date onwards)"""
+    conn.execute(CREATE_DAILY_TABLE)
+    if from_date is None:
+        conn.execute('DELETE FROM daily_consumption')
+        where, params = '', ()
+    else:
+        conn.execute('DELETE FROM daily_consumption WHERE date_conso >= ?', (from_date,))
+        where, params = 'WHERE date_conso >= ?', (from_date,)
+    conn.execute(f'''
+        INSERT INTO daily_consumption
+            (famille_norm, date_conso, qte_sum, qte_count, qte_min, qte_max, qte_sumsq)
+        SELECT famille_norm, date_conso, SUM(qte), COUNT(*), MIN(qte), MAX(qte), SUM(qte * qte)
+        FROM consumption
+        {where}
+        GROUP BY famille_norm, date_conso
+    ''', params)
+
+
+def rebuild_period_rollups(conn, from_date=None):
+    """Recompute the monthly tier from the daily rollup (all months, or those touched from from_date)"""
+    conn.execute(CREATE_MONTHLY_TABLE)
+    if from_date is None:
+        conn.execute('DELETE FROM monthly_consumption')
+        month_where, month_params = '', ()
+    else:
+        from_month = from_date[:7]
+        conn.execute('DELETE FROM monthly_consumption WHERE month >= ?', (from_month,))
+        month_where, month_params = 'WHERE date_conso >= ?', (from_month + '-01',)
+    conn.execute(f'''
+        INSERT INTO monthly_consumption
+            (famille_norm, month, qte_sum, qte_count, qte_min, qte_max, qte_sumsq)
+        SELECT famille_norm, substr(date_conso, 1, 7), SUM(qte_sum), SUM(qte_count),
+               MIN(qte_min), MAX(qte_max), SUM(qte_sumsq)
+        FROM daily_consumption
+        {month_where}
+        GROUP BY famille_norm, substr(date_conso, 1, 7)
+    ''', month_params)
+
+
+def rebuild_rollups(conn, from_date=None):
+    """Day -> month, the monthly tier built from the daily one"""
+    rebuild_daily_rollup(conn, from_date=from_date)
+    rebuild_period_rollups(conn, from_date=from_date)
+
+
+def ensure_rollups(conn):
+    """Build the rollup tiers for databases created before they existed"""
+    conn.execute(CREATE_DAILY_TABLE)
+    conn.execute(CREATE_MONTHLY_TABLE)
+    # Older databases also carry a yearly tier that nothing reads any more
+    conn.execute('DROP TABLE IF EXISTS yearly_consumption')
+    if conn.execute('SELECT 1 FROM daily_consumption LIMIT 1').fetchone() is None:
+        print("Building daily rollup...")
+        rebuild_rollups(conn)
+        conn.commit()
+    elif conn.execute('SELECT 1 FROM monthly_consumption LIMIT 1').fetchone() is None:
+        print("Building monthly rollup...")
+        rebuild_period_rollups(conn)
+        conn.commit()
+
+
+# -----------------------
+# Bulk load helpers
+# -----------------------
+
+def drop_indexes(conn):
+    """Drop secondary indexes so the load does not maintain them row by row"""
+    for name, _ in CONSUMPTION_INDEXES:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def create_indexes(conn):
+    """(Re)build secondary indexes in one sorted pass after the load"""
+    for _, ddl in CONSUMPTION_INDEXES:
+        conn.execute(ddl)
+
+
+def set_load_pragmas(conn):
+    """Trade durability for speed while the bulk load runs"""
+    conn.execute('PRAGMA journal_mode = MEMORY')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA cache_size = -200000')
+
+
+def restore_pragmas(conn):
+    """Durable settings once the data is committed; WAL lets pooled readers run during later loads"""
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+
+
+def consumption_columns(df):
+    """Column arrays (ISO date, famille, original, qte) ready for executemany"""
+    dates = df['DATE_CONSO'].astype(str).tolist()
+    familles = df['FAMILLE_NORM'].tolist()
+    if 'FAMILLE' in df.columns:
+        originals = df['FAMILLE'].astype(str).tolist()
+    else:
+        originals = [''] * len(df)
+    quantities = df['QTE'].astype(float).tolist()
+    return dates, familles, originals, quantities
+
+
+def bulk_insert(conn, df, batch_size=INGEST_BATCH_SIZE):
+    """Insert a normalized DataFrame with executemany over column slices"""
+    dates, familles, originals, quantities = consumption_columns(df)
+    total = len(dates)
+    for start in range(0, total, batch_size):
+        stop = start + batch_size
+        conn.executemany(INSERT_CONSUMPTION, zip(
+            dates[start:stop], familles[start:stop],
+            originals[start:stop], quantities[start:stop]
+        ))
+    return total
+
+
+def as_chunks(frames):
+    """A single DataFrame or an iterable of DataFrame chunks, as an iterable of chunks"""
+    return [frames] if hasattr(frames, 'columns') else frames
+
+
+def bulk_load(conn, frames, batch_size=INGEST_BATCH_SIZE, replace=True):
+    """Load a DataFrame (or a stream of chunks) into consumption in a single transaction and report throughput"""
+    load_start = time.time()
+    set_load_pragmas(conn)
+    try:
+        conn.execute(CREATE_CONSUMPTION_TABLE)
+        conn.execute('BEGIN')
+        if replace:
+            conn.execute('DELETE FROM consumption')
+        drop_indexes(conn)
+        inserted = 0
+        for chunk in as_chunks(frames):
+            inserted += bulk_insert(conn, chunk, batch_size=batch_size)
+        insert_time = time.time() - load_start
+        create_indexes(conn)
+        rebuild_rollups(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        restore_pragmas(conn)
+
+    total_time = time.time() - load_start
+    rate = inserted / insert_time if insert_time > 0 else float(inserted)
+    print(f"Bulk load: {inserted} rows in {total_time:.2f}s "
+          f"(insert {insert_time:.2f}s, {rate:,.0f} rows/sec)")
+    return inserted
+
+
+# -----------------------
+# Incremental load
+# -----------------------
+
+CREATE_STATE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS ingest_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+'''
+
+
+def source_signature(path):
+    """(mtime, size) of the source file, used to detect a new extract"""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def get_state(conn, key):
+    conn.execute(CREATE_STATE_TABLE)
+    row = conn.execute('SELECT value FROM ingest_state WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_state(conn, key, value):
+    conn.execute(CREATE_STATE_TABLE)
+    conn.execute('INSERT OR REPLACE INTO ingest_state (key, value) VALUES (?, ?)', (key, value))
+
+
+def record_source(conn, path, commit=True):
+    """Remember which extract the database was last loaded from"""
+    set_state(conn, 'source_path', os.path.abspath(path))
+    set_state(conn, 'source_signature', source_signature(path))
+    if commit:
+        conn.commit()
+
+
+def source_changed(conn, path):
+    """True when path differs from the extract recorded at the last load"""
+    return (get_state(conn, 'source_path') != os.path.abspath(path)
+            or get_state(conn, 'source_signature') != source_signature(path))
+
+
+def has_data(conn):
+    table = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'consumption'"
+    ).fetchone()
+    return table is not None and conn.execute('SELECT 1 FROM consumption LIMIT 1').fetchone() is not None
+
+
+def get_watermark(conn):
+    """Latest date_conso already loaded (ISO string) or None"""
+    return conn.execute('SELECT MAX(date_conso) FROM consumption').fetchone()[0]
+
+
+def incremental_load(conn, frames, batch_size=INGEST_BATCH_SIZE, record_path=None):
+    """Append rows at or after the watermark day; returns (inserted, first ISO date touched).
+
+    frames is a DataFrame or a stream of chunks. The watermark day itself is
+    reloaded because the previous extract may have ended part-way through it.
+    Rows older than the watermark are ignored, so corrections to past days
+    still need a full rebuild.
+
+    The write lock is taken (BEGIN IMMEDIATE) before the watermark is read,
+    unless the caller already holds it. record_path is recorded as the loaded
+    extract in the same transaction, so a worker that waited for the lock sees
+    the new rows and the new signature together.
+    """
+    load_start = time.time()
+    inserted, first_date = 0, None
+    watermark_reloaded = False
+    try:
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        watermark = get_watermark(conn)
+        for chunk in as_chunks(frames):
+            dates = chunk['DATE_CONSO'].astype(str)
+            if watermark is not None:
+                keep = dates >= watermark
+                chunk, dates = chunk[keep], dates[keep]
+            if chunk.empty:
+                continue
+            # Nothing newer than the watermark is stored yet, so only that day can need replacing
+            if not watermark_reloaded and watermark is not None and (dates == watermark).any():
+                conn.execute('DELETE FROM consumption WHERE date_conso = ?', (watermark,))
+                watermark_reloaded = True
+            chunk_first = dates.min()
+            first_date = chunk_first if first_date is None else min(first_date, chunk_first)
+            inserted += bulk_insert(conn, chunk, batch_size=batch_size)
+        if inserted:
+            rebuild_rollups(conn, from_date=first_date)
+        if record_path is not None:
+            record_source(conn, record_path, commit=False)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if not inserted:
+        print(f"Incremental load: no rows at or after {watermark}")
+        return 0, None
+    total_time = time.time() - load_start
+    rate = inserted / total_time if total_time > 0 else float(inserted)
+    print(f"Incremental load: {inserted} rows from {first_date} in {total_time:.2f}s "
+          f"({rate:,.0f} rows/sec)")
+    return inserted, first_date
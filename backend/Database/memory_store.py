@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Database.ingest import source_signature
+
+# -----------------------
+# In-memory column store (pandas mode)
+# -----------------------
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ARRAYS = ('offsets', 'famille_codes', 'dates', 'qte')
+EMPTY_AGGREGATES = {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}
+
+
+class ColumnStore:
+    """Famille-partitioned, date-sorted columns: datetime64[D] dates, float64 QTE, int32 famille codes.
+
+    Famille k owns rows offsets[k]:offsets[k + 1]. A range lookup is two binary
+    searches inside that block and returns views, never copies.
+    """
+
+    def __init__(self, familles, offsets, famille_codes, dates, qte):
+        self.familles = list(familles)
+        self.codes = {famille: code for code, famille in enumerate(self.familles)}
+        self.offsets = offsets
+        self.famille_codes = famille_codes
+        self.dates = dates
+        self.qte = qte
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build from cleaned DATE_CONSO / FAMILLE_NORM / QTE chunks; only the compact columns outlive each chunk"""
+        import pandas as pd
+        code_of = {}
+        code_parts = [np.empty(0, dtype=np.int32)]
+        date_parts = [np.empty(0, dtype='datetime64[D]')]
+        qte_parts = [np.empty(0, dtype=np.float64)]
+        for chunk in chunks:
+            local_codes, uniques = pd.factorize(chunk['FAMILLE_NORM'])
+            to_global = np.array([code_of.setdefault(famille, len(code_of)) for famille in uniques], dtype=np.int32)
+            code_parts.append(to_global[local_codes])
+            date_parts.append(pd.to_datetime(chunk['DATE_CONSO']).to_numpy().astype('datetime64[D]'))
+            qte_parts.append(chunk['QTE'].to_numpy(dtype=np.float64))
+
+        # Final codes follow the sorted famille names
+        familles = sorted(code_of)
+        to_sorted = np.empty(len(familles), dtype=np.int32)
+        for code, famille in enumerate(familles):
+            to_sorted[code_of[famille]] = code
+        codes = to_sorted[np.concatenate(code_parts)]
+        dates = np.concatenate(date_parts)
+        qte = np.concatenate(qte_parts)
+        order = np.lexsort((dates, codes))
+        codes = codes[order]
+        offsets = np.searchsorted(codes, np.arange(len(familles) + 1), side='left')
+        return cls(familles, offsets, codes, dates[order], qte[order])
+
+    # -----------------------
+    # Snapshot (memory-mapped .npy files + meta.json)
+    # -----------------------
+
+    def save(self, directory, signature):
+        """Write the columns as .npy files; meta.json goes last so a half-written snapshot never loads"""
+        os.makedirs(directory, exist_ok=True)
+        for name in SNAPSHOT_ARRAYS:
+            column = np.ascontiguousarray(getattr(self, name))
+            _publish(directory, f"{name}.npy", lambda f: np.save(f, column))
+        meta = {'version': SNAPSHOT_VERSION, 'signature': signature, 'familles': self.familles, 'rows': len(self)}
+        _publish(directory, 'meta.json', lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode('utf-8')))
+
+    @classmethod
+    def load(cls, directory, signature):
+        """Map a snapshot read-only (pages shared between worker processes); None if missing or stale"""
+        try:
+            with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != SNAPSHOT_VERSION or meta.get('signature') != signature:
+            return None
+        try:
+            arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in SNAPSHOT_ARRAYS}
+        except (OSError, ValueError) as e:
+            print(f"Column snapshot unreadable, rebuilding: {e}")
+            return None
+        if len(arrays['qte']) != meta['rows']:
+            return None
+        return cls(meta['familles'], **arrays)
+
+    def __contains__(self, famille):
+        return famille in self.codes
+
+    def __len__(self):
+        return len(self.qte)
+
+    @property
+    def nbytes(self):
+        return self.dates.nbytes + self.qte.nbytes + self.famille_codes.nbytes + self.offsets.nbytes
+
+    def _slice(self, famille, start_date, end_date):
+        """Row positions [a, b) of famille between the two dates (inclusive)"""
+        code = self.codes[famille]
+        lo, hi = int(self.offsets[code]), int(self.offsets[code + 1])
+        block = self.dates[lo:hi]
+        a = lo + int(np.searchsorted(block, np.datetime64(start_date, 'D'), side='left'))
+        b = lo + int(np.searchsorted(block, np.datetime64(end_date, 'D'), side='right'))
+        return a, max(a, b)
+
+    def aggregates(self, famille, start_date, end_date):
+        a, b = self._slice(famille, start_date, end_date)
+        if a == b:
+            return dict(EMPTY_AGGREGATES)
+        values = self.qte[a:b]
+        total = float(values.sum())
+        return {
+            'sum': total,
+            'mean': total / (b - a),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'count': b - a
+        }
+
+    def breakdown(self, famille, start_date, end_date, granularity='day'):
+        """[{'period', 'total', 'entries'}] per day ('YYYY-MM-DD') or month ('YYYY-MM'), in date order"""
+        a, b = self._slice(famille, start_date, end_date)
+        if a == b:
+            return []
+        days = self.dates[a:b]
+        keys = days.astype('datetime64[M]') if granularity == 'month' else days
+        # Rows are date-sorted, so each group is a contiguous run: reduceat instead of a hash groupby
+        starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+        totals = np.add.reduceat(self.qte[a:b], starts)
+        entries = np.diff(np.append(starts, b - a))
+        periods = np.datetime_as_string(keys[starts])
+        return [
+            {'period': period, 'total': total, 'entries': count}
+            for period, total, count in zip(periods.tolist(), totals.tolist(), entries.tolist())
+        ]
+
+    def sample_rows(self, famille, start_date, end_date, limit=100):
+        a, b = self._slice(famille, start_date, end_date)
+        b = min(b, a + limit)
+        return [
+            {'DATE_CONSO': day, 'FAMILLE_NORM': famille, 'QTE': qte}
+            for day, qte in zip(np.datetime_as_string(self.dates[a:b]).tolist(), self.qte[a:b].tolist())
+        ]
+
+    def date_range(self):
+        if not len(self.dates):
+            return None, None
+        return str(self.dates.min()), str(self.dates.max())
+
+
+def _publish(directory, name, write):
+    """write(f) into a private temp file, then rename it over name.
+
+    Temp names are unique per call, so workers rebuilding the snapshot at the
+    same time never publish each other's half-written files.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def snapshot_signature(*paths):
+    """Identity of the source extracts the snapshot was built from"""
+    return ';'.join(f"{os.path.abspath(path)}={source_signature(path)}" for path in paths if path and os.path.exists(path))
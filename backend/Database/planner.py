@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+# -----------------------
+# Rollup tiers
+# -----------------------
+
+# tier -> (table, key column); keys are ISO prefixes: 'YYYY-MM-DD', 'YYYY-MM'
+TIERS = {
+    'day': ('daily_consumption', 'date_conso'),
+    'month': ('monthly_consumption', 'month'),
+}
+
+
+def month_end(d):
+    """Last day of d's month"""
+    first_of_next = date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+    return first_of_next - timedelta(days=1)
+
+
+def plan_range(start_date, end_date):
+    """Split [start_date, end_date] into the fewest rollup segments.
+
+    Whole months come from the monthly tier, partial edges from the daily
+    table. Returns [(tier, lo_key, hi_key)] in date order.
+    """
+    segments = []
+    current = start_date
+    while current <= end_date:
+        if current.day == 1 and month_end(current) <= end_date:
+            last = current
+            while month_end(month_end(last) + timedelta(days=1)) <= end_date:
+                last = month_end(last) + timedelta(days=1)
+            segments.append(('month', current.isoformat()[:7], last.isoformat()[:7]))
+            current = month_end(last) + timedelta(days=1)
+        else:
+            last = min(month_end(current), end_date)
+            segments.append(('day', current.isoformat(), last.isoformat()))
+            current = last + timedelta(days=1)
+    return segments
+
+
+def segments_sql(segments, familles, select):
+    """UNION ALL of one SELECT per segment, restricted to familles (None = all).
+
+    select may use {key} for the tier's key column.
+    """
+    if familles is None:
+        famille_filter, famille_params = '', []
+    else:
+        famille_filter = f"famille_norm IN ({', '.join('?' * len(familles))}) AND "
+        famille_params = list(familles)
+    parts, params = [], []
+    for tier, lo, hi in segments:
+        table, key = TIERS[tier]
+        parts.append(f"SELECT famille_norm, {select.format(key=key)} FROM {table} WHERE {famille_filter}{key} BETWEEN ? AND ?")
+        params.extend(famille_params)
+        params.extend((lo, hi))
+    return '\nUNION ALL\n'.join(parts), params
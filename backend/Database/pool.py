@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_CACHED_STATEMENTS = 256
+
+# -----------------------
+# Read-only connection pool
+# -----------------------
+
+
+class ConnectionPool:
+    """Long-lived read-only SQLite connections, one per worker thread.
+
+    At most max_connections threads hold a connection at the same time; the
+    others wait, and that wait is reported in stats().
+    """
+
+    def __init__(self, db_path, max_connections=DB_POOL_SIZE):
+        self.db_path = os.path.abspath(db_path)
+        self.max_connections = max_connections
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._checkouts = 0
+        self._in_use = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=DB_CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+        conn.execute(f'PRAGMA cache_size = -{DB_CACHE_SIZE_KB}')
+        conn.execute('PRAGMA query_only = ON')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        wait_start = time.perf_counter()
+        self._slots.acquire()
+        waited = time.perf_counter() - wait_start
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        try:
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._connect()
+                self._local.conn = conn
+            yield conn
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "database": self.db_path,
+                "max_connections": self.max_connections,
+                "open_connections": len(self._connections),
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "total_wait_ms": round(self._total_wait * 1000, 3),
+                "avg_wait_ms": round(self._total_wait * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,143 @@
+import numpy as np
+
+# -----------------------
+# Per-famille prefix sums
+# -----------------------
+
+
+class FamilleSeries:
+    """Day-indexed cumulative sums/counts plus sparse tables for min/max of one famille"""
+
+    def __init__(self, dates, sums, counts, mins, maxs):
+        days = np.asarray(dates, dtype='datetime64[D]')
+        order = np.argsort(days)
+        days = days[order]
+        self.base = days[0]
+        offsets = (days - self.base).astype(np.int64)
+        size = int(offsets[-1]) + 1
+
+        daily_sum = np.zeros(size, dtype=np.float64)
+        daily_count = np.zeros(size, dtype=np.int64)
+        daily_min = np.full(size, np.inf)
+        daily_max = np.full(size, -np.inf)
+        daily_sum[offsets] = np.asarray(sums, dtype=np.float64)[order]
+        daily_count[offsets] = np.asarray(counts, dtype=np.int64)[order]
+        daily_min[offsets] = np.asarray(mins, dtype=np.float64)[order]
+        daily_max[offsets] = np.asarray(maxs, dtype=np.float64)[order]
+
+        self.size = size
+        self.daily_sum = daily_sum
+        self.daily_count = daily_count
+        self.cum_sum = np.concatenate(([0.0], np.cumsum(daily_sum)))
+        self.cum_count = np.concatenate(([0], np.cumsum(daily_count)))
+        self.min_table = self._sparse_table(daily_min, np.minimum)
+        self.max_table = self._sparse_table(daily_max, np.maximum)
+
+    @staticmethod
+    def _sparse_table(values, combine):
+        levels = [values]
+        width = 1
+        while width * 2 <= len(values):
+            prev = levels[-1]
+            levels.append(combine(prev[:-width], prev[width:]))
+            width *= 2
+        return levels
+
+    @staticmethod
+    def _query_table(table, combine, lo, hi):
+        level = (hi - lo + 1).bit_length() - 1
+        return combine(table[level][lo], table[level][hi - (1 << level) + 1])
+
+    def _bounds(self, start_date, end_date):
+        """Clamp [start_date, end_date] to day offsets; None if disjoint"""
+        lo = int((np.datetime64(start_date, 'D') - self.base).astype(np.int64))
+        hi = int((np.datetime64(end_date, 'D') - self.base).astype(np.int64))
+        lo, hi = max(lo, 0), min(hi, self.size - 1)
+        if lo > hi:
+            return None
+        return lo, hi
+
+    def aggregates(self, start_date, end_date):
+        bounds = self._bounds(start_date, end_date)
+        if bounds is None:
+            return {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}
+        lo, hi = bounds
+        total = float(self.cum_sum[hi + 1] - self.cum_sum[lo])
+        count = int(self.cum_count[hi + 1] - self.cum_count[lo])
+        if count == 0:
+            return {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}
+        return {
+            'sum': total,
+            'mean': total / count,
+            'min': float(self._query_table(self.min_table, min, lo, hi)),
+            'max': float(self._query_table(self.max_table, max, lo, hi)),
+            'count': count
+        }
+
+    def breakdown(self, start_date, end_date, granularity='day'):
+        """Non-empty days ('YYYY-MM-DD') or months ('YYYY-MM') with their total and entry count"""
+        bounds = self._bounds(start_date, end_date)
+        if bounds is None:
+            return []
+        lo, hi = bounds
+        if granularity == 'month':
+            # Month boundaries as day offsets, clipped to the range; sums come from the prefix arrays
+            first_day = self.base + lo
+            months = np.arange(first_day.astype('datetime64[M]'), (self.base + hi).astype('datetime64[M]') + 1)
+            edges = np.clip((months.astype('datetime64[D]') - self.base).astype(np.int64), lo, hi + 1)
+            edges = np.append(edges, hi + 1)
+            totals = self.cum_sum[edges[1:]] - self.cum_sum[edges[:-1]]
+            counts = self.cum_count[edges[1:]] - self.cum_count[edges[:-1]]
+            present = np.nonzero(counts)[0]
+            periods = months[present].astype(str)
+            totals, counts = totals[present], counts[present]
+        else:
+            counts = self.daily_count[lo:hi + 1]
+            present = np.nonzero(counts)[0]
+            periods = (self.base + lo + present).astype(str)
+            totals = self.daily_sum[lo:hi + 1][present]
+            counts = counts[present]
+        return [
+            {'period': period, 'total': float(total), 'entries': int(entries)}
+            for period, total, entries in zip(periods.tolist(), totals.tolist(), counts.tolist())
+        ]
+
+
+class PrefixSumIndex:
+    """In-memory range index: sum/count/mean in two lookups, min/max via sparse tables"""
+
+    def __init__(self, series):
+        self.series = series
+
+    def __contains__(self, famille):
+        return famille in self.series
+
+    def aggregates(self, famille, start_date, end_date):
+        return self.series[famille].aggregates(start_date, end_date)
+
+    def breakdown(self, famille, start_date, end_date, granularity='day'):
+        return self.series[famille].breakdown(start_date, end_date, granularity)
+
+    @classmethod
+    def from_daily_rows(cls, rows):
+        """Build from (famille, date, sum, count, min, max) rows ordered by famille"""
+        series = {}
+        current, bucket = None, []
+        for row in rows:
+            if row[0] != current and bucket:
+                series[current] = FamilleSeries(*zip(*[r[1:] for r in bucket]))
+                bucket = []
+            current = row[0]
+            bucket.append(row)
+        if bucket:
+            series[current] = FamilleSeries(*zip(*[r[1:] for r in bucket]))
+        return cls(series)
+
+    @classmethod
+    def from_sqlite(cls, conn):
+        cursor = conn.execute('''
+            SELECT famille_norm, date_conso, qte_sum, qte_count, qte_min, qte_max
+            FROM daily_consumption
+            ORDER BY famille_norm, date_conso
+        ''')
+        return cls.from_daily_rows(cursor.fetchall())
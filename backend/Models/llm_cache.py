@@ -0,0 +1,121 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from functions.cache import TTLCache
+
+load_dotenv()
+
+MODEL_NAME = os.getenv("MODEL_NAME")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")  # empty = memory tier only
+MIN_COMPLETION_LENGTH = 10
+
+
+def prompt_fingerprint(prompt, model=MODEL_NAME):
+    """Stable key for a (model, prompt) pair"""
+    return hashlib.sha256(f"{model}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Prompt -> completion cache: in-memory LRU tier plus optional SQLite tier that survives restarts"""
+
+    def __init__(self, maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, db_path=LLM_CACHE_DB, model=MODEL_NAME):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.model = model
+        self.db_path = db_path
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    fingerprint TEXT PRIMARY KEY,
+                    model TEXT,
+                    prompt TEXT,
+                    completion TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._conn.commit()
+
+    def get(self, prompt):
+        completion = self.get_memory(prompt)
+        if completion is None:
+            completion = self.get_disk(prompt)
+        return completion
+
+    def get_disk(self, prompt):
+        """Disk tier only (promoted to memory on a hit); the caller has already missed the memory tier"""
+        if self._conn is None:
+            return None
+        key = prompt_fingerprint(prompt, self.model)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT completion, created_at FROM llm_cache WHERE fingerprint = ?', (key,)
+            ).fetchone()
+            if row is None or (self.ttl and row[1] + self.ttl < time.time()):
+                return None
+            self.disk_hits += 1
+        self.memory.set(key, row[0])
+        return row[0]
+
+    def get_memory(self, prompt):
+        """Memory tier only: never blocks, safe to call on the event loop"""
+        return self.memory.get(prompt_fingerprint(prompt, self.model))
+
+    @property
+    def has_disk(self):
+        return self._conn is not None
+
+    def set(self, prompt, completion):
+        if not completion or len(completion.strip()) < MIN_COMPLETION_LENGTH:
+            return
+        key = prompt_fingerprint(prompt, self.model)
+        self.memory.set(key, completion)
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_cache (fingerprint, model, prompt, completion, created_at) VALUES (?, ?, ?, ?, ?)',
+                (key, self.model, prompt, completion, time.time())
+            )
+            self._conn.commit()
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk"] = self.db_path or None
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+
+llm_cache = LLMCache()
+
+
+async def lookup_completion(prompt):
+    """Cached completion or None, without touching the LLM pool.
+
+    The memory tier is read inline and the disk tier on the database pool, so
+    a repeat question never waits behind in-flight Ollama calls. Each tier is
+    looked at once per call.
+    """
+    completion = llm_cache.get_memory(prompt)
+    if completion is None and llm_cache.has_disk:
+        from functions.executors import run_db
+        completion = await run_db(llm_cache.get_disk, prompt)
+    if completion is not None:
+        print("LLM cache hit")
+    return completion
+
+
+def invoke_and_cache(llm, prompt):
+    """llm.invoke(prompt) for a prompt lookup_completion already missed; the completion is stored for next time"""
+    completion = llm.invoke(prompt)
+    llm_cache.set(prompt, completion)
+    return completion
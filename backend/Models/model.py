@@ -1,6 +1,6 @@
 from dotenv import load_dotenv
 import os
-from langchain_ollama import OllamaLLM
+import threading
 
 load_dotenv()
 
@@ -9,8 +9,24 @@ MODEL_NAME = os.getenv("MODEL_NAME")
 
 def initialize_llm_model():
     try:
+        # Imported here: langchain is the slowest import of the app
+        from langchain_ollama import OllamaLLM
         llmModel = OllamaLLM(model=MODEL_NAME, temperature=0.1)
     except Exception as e:
         print("LLM init failed:", e)
         llmModel = None
-    return llmModel
\ No newline at end of file
+    return llmModel
+
+_llm = None
+_llm_ready = False
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """Shared LLM client, initialized on first use (or by the startup warm-up)"""
+    global _llm, _llm_ready
+    if not _llm_ready:
+        with _llm_lock:
+            if not _llm_ready:
+                _llm = initialize_llm_model()
+                _llm_ready = True
+    return _llm
@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def check(USE_DATABASE=True, df_data=None):
+def check(USE_DATABASE=True, store=None):
 
     if USE_DATABASE:
         with get_db_connection() as conn:
@@ -11,4 +11,4 @@ def check(USE_DATABASE=True, df_data=None):
             count = cursor.fetchone()['count']
             return {"status": "healthy", "database": "sqlite", "records": count}
     else:
-        return {"status": "healthy", "database": "pandas", "records": len(df_data)}
+        return {"status": "healthy", "database": "pandas", "records": len(store)}
@@ -0,0 +1,18 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Database.database import get_pool
+from functions.query_execute import answer_cache, mode_latency
+from Models.llm_cache import llm_cache
+from functions.startup import startup_report
+
+def collect(USE_DATABASE=True):
+    stats = {
+        "startup": startup_report(),
+        "modes": mode_latency.stats(),
+        "answer_cache": answer_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+    }
+    if USE_DATABASE:
+        stats["pool"] = get_pool().stats()
+    return stats
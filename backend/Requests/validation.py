@@ -3,7 +3,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from Database.database import get_db_connection
 
-def validate_data(USE_DATABASE=True, df_data=None, available_families=None):
+def validate_data(USE_DATABASE=True, store=None, available_families=None):
     print("\nDATA VALIDATION:")
     if USE_DATABASE:
         with get_db_connection() as conn:
@@ -14,8 +14,9 @@ def validate_data(USE_DATABASE=True, df_data=None, available_families=None):
             print(f"Database mode - Total records: {count}")
             print(f"Date range: {date_range[0]} to {date_range[1]}")
     else:
-        print(f"Pandas mode - Total records: {len(df_data)}")
-        print(f"Date range: {df_data['DATE_CONSO'].min()} to {df_data['DATE_CONSO'].max()}")
+        first_date, last_date = store.date_range()
+        print(f"Pandas mode - Total records: {len(store)}")
+        print(f"Date range: {first_date} to {last_date}")
     
     print(f"Available families: {len(available_families)}")
     print(f"Families sample: {available_families[:10]}")
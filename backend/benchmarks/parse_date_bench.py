@@ -0,0 +1,96 @@
+"""Microbenchmark: single-pass parse_date_range_from_text vs the previous regex cascade.
+
+Run from backend/: python benchmarks/parse_date_bench.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.parse_date import parse_date_range_from_text
+
+QUESTIONS = [
+    "consommation de MAIS du 01/06/2024 au 30/06/2024",
+    "consommation de ORGE le 03/06/2024",
+    "combien de blé fourrager entre le 01/05/2024 et le 15/05/2024",
+    "somme de soja de 01/01/2024 jusqu'au 31/03/2024",
+    "moyenne MAIS 01/06/2024 - 07/06/2024",
+    "quelle est la consommation au 03/06/2024",
+    "consommation pour le 3/6/24",
+    "consommation de MAIS",
+]
+
+# -----------------------
+# Previous implementation (regex cascade), kept here for comparison only
+# -----------------------
+
+def legacy_parse_date_range_from_text(text: str):
+    from dateutil import parser as dateutil_parser
+    text = text.strip()
+    
+    range_patterns = [
+        r'du\s+(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+(?:au|à)\s+(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
+        r'entre\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+et\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
+        r'de\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+(?:au|à|jusqu\'au|jusqu\s+au)\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
+        r'(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+(?:au|à|-|jusqu\'au|jusqu\s+au)\s+(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})'
+    ]
+    
+    for pattern in range_patterns:
+        m = re.search(pattern, text, flags=re.IGNORECASE)
+        if m:
+            try:
+                d1 = dateutil_parser.parse(m.group(1), dayfirst=True).date()
+                d2 = dateutil_parser.parse(m.group(2), dayfirst=True).date()
+                return (min(d1, d2), max(d1, d2), 'range')
+            except:
+                continue
+    
+    single_date_patterns = [
+        r'(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})(?!\s*(?:au|à|-|jusqu))',
+        r'(?:au|à)\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})(?!\s*(?:au|à|-|jusqu))',
+        r'pour\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
+    ]
+    
+    for pattern in single_date_patterns:
+        m = re.search(pattern, text, flags=re.IGNORECASE)
+        if m:
+            try:
+                d = dateutil_parser.parse(m.group(1), dayfirst=True).date()
+                return (d, d, 'single')
+            except:
+                continue
+    
+    dates = re.findall(r'\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4}', text)
+    parsed = []
+    for ds in dates:
+        try:
+            parsed.append(dateutil_parser.parse(ds, dayfirst=True).date())
+        except:
+            continue
+    
+    if len(parsed) >= 2:
+        return (min(parsed[0], parsed[1]), max(parsed[0], parsed[1]), 'range')
+    elif len(parsed) == 1:
+        return (parsed[0], parsed[0], 'single')
+    
+    return (None, None, None)
+
+def main(number=2000):
+    mismatches = [
+        (q, legacy_parse_date_range_from_text(q), parse_date_range_from_text(q))
+        for q in QUESTIONS
+        if legacy_parse_date_range_from_text(q) != parse_date_range_from_text(q)
+    ]
+    for q, old, new in mismatches:
+        print(f"DIFF {q!r}: legacy={old} new={new}")
+
+    for name, func in (("legacy", legacy_parse_date_range_from_text), ("single-pass", parse_date_range_from_text)):
+        elapsed = timeit.timeit(lambda: [func(q) for q in QUESTIONS], number=number)
+        per_call = elapsed / (number * len(QUESTIONS)) * 1e6
+        print(f"{name:12s} {per_call:8.2f} µs/question")
+
+
+if __name__ == "__main__":
+    main()
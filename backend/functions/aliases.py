@@ -0,0 +1,38 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ALIAS_FILE = os.getenv("ALIAS_FILE", "famille_aliases.json")
+
+# Used when the alias file is missing; checked before the family names themselves
+DEFAULT_ALIASES = [
+    ("MAIS", "MAIS"),
+    ("MAÏS", "MAIS"),
+    ("CORN", "MAIS"),
+    ("BLE FOURRAGER", "BLE FOURRAGER"),
+    ("BLED FOURRAGER", "BLE FOURRAGER"),
+    ("BLÉ FOURRAGER", "BLE FOURRAGER"),
+    ("BLÉ FOURAGER", "BLE FOURRAGER"),
+    ("ORG", "ORGE"),
+    ("SOJA", "GRAINES DE SOJA"),
+]
+
+def alias_file_signature(path=ALIAS_FILE):
+    """(mtime, size) of the alias file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def load_aliases(path=ALIAS_FILE):
+    """Ordered (variant, standard) pairs from the JSON alias file; earlier entries win"""
+    if not os.path.exists(path):
+        return list(DEFAULT_ALIASES)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object of variant -> famille")
+    return [(str(variant), str(standard)) for variant, standard in data.items()]
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+from typing import List
+
+from Database.database import get_data_source, data_source_ready, load_batch_index, breakdown_granularity
+from Models.model import get_llm
+from Models.llm_cache import invoke_and_cache, lookup_completion
+from functions.executors import run_db, run_llm, LLM_CONCURRENCY
+from functions.query_execute import (
+    Question, parse_question, resolve_mode, needs_llm, answer_cache, answer_cache_key, cached_answer, compute_numbers,
+    fill_numbers, fill_comparison, format_breakdown, build_prompt, finish_answer,
+)
+
+# LLM calls one batch may have in flight at once (the LLM pool itself is shared with /query)
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", str(LLM_CONCURRENCY)))
+
+EMPTY_NUMBERS = {'aggregates': {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}, 'breakdown': []}
+
+
+# -----------------------
+# LLM fan-out
+# -----------------------
+
+async def complete_prompts(prompts):
+    """One completion per distinct prompt: cache hits first, misses on the LLM pool with bounded concurrency.
+
+    Returns ({prompt: (text, ms)}, number of LLM calls made).
+    """
+    unique = list(dict.fromkeys(prompts))
+
+    async def lookup(prompt):
+        lookup_start = time.time()
+        text = await lookup_completion(prompt)
+        return text, round((time.time() - lookup_start) * 1000, 2)
+
+    hits = await asyncio.gather(*(lookup(prompt) for prompt in unique))
+    completions = {prompt: (text.strip(), ms) for prompt, (text, ms) in zip(unique, hits) if text is not None}
+    misses = [prompt for prompt in unique if prompt not in completions]
+    if not misses:
+        return completions, 0
+    llm = await run_llm(get_llm)
+    if llm is None:
+        return completions, 0
+    slots = asyncio.Semaphore(max(1, BATCH_LLM_CONCURRENCY))
+
+    async def complete(prompt):
+        async with slots:
+            llm_start = time.time()
+            try:
+                text = (await run_llm(invoke_and_cache, llm, prompt)).strip()
+            except Exception as e:
+                print("LLM invoke error:", e)
+                text = ""
+            return text, round((time.time() - llm_start) * 1000, 2)
+
+    completions.update(zip(misses, await asyncio.gather(*(complete(prompt) for prompt in misses))))
+    return completions, len(misses)
+
+
+# -----------------------
+# Batch endpoint
+# -----------------------
+
+async def query_batch(questions: List[Question], USE_DATABASE, AGGREGATION_STRATEGY):
+    """Answer many questions at once: shared SQL work per famille/date span, bounded LLM fan-out, results in order.
+
+    Each result reports its own compute_ms (parse + numbers) and llm_ms; the
+    shared span read and LLM fan-out are only reported at batch level.
+    """
+    batch_start = time.time()
+    if not data_source_ready():
+        await run_db(get_data_source)
+
+    results = [None] * len(questions)
+    pending = []
+    compute_ms = {}
+    for position, q in enumerate(questions):
+        parse_start = time.time()
+        mode = resolve_mode(q, AGGREGATION_STRATEGY)
+        ctx, error = parse_question(q)
+        if error is not None:
+            results[position] = error
+            continue
+        use_llm = needs_llm(ctx, mode)
+        cache_key = answer_cache_key(ctx, use_llm, q.include_rows)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            results[position] = cached_answer(cached, ctx, USE_DATABASE, mode)
+            continue
+        compute_ms[position] = (time.time() - parse_start) * 1000
+        pending.append((position, q, mode, use_llm, ctx, cache_key))
+
+    # Every (famille, range) of the batch; overlapping ranges are merged and read once
+    ranges_by_famille = {}
+    for _, q, _, _, ctx, _ in pending:
+        if not q.include_rows:
+            for famille in ctx['familles']:
+                ranges_by_famille.setdefault(famille, []).append((ctx['start_date'], ctx['end_date']))
+
+    query_start = time.time()
+    index, spans = await run_db(load_batch_index, ranges_by_famille, USE_DATABASE=USE_DATABASE)
+    query_time = round((time.time() - query_start) * 1000, 2)
+    print(f"Batch of {len(questions)} questions: {spans} spans read in {query_time}ms")
+
+    for position, q, _, _, ctx, _ in pending:
+        compute_start = time.time()
+        if q.include_rows:
+            # Sample rows come from the raw table; fetched per question
+            await compute_numbers(ctx, USE_DATABASE, include_rows=True)
+        else:
+            start_date, end_date = ctx['start_date'], ctx['end_date']
+            granularity = breakdown_granularity(start_date, end_date, ctx['granularity'])
+            numbers = {
+                famille: {
+                    'aggregates': index.aggregates(famille, start_date, end_date),
+                    'breakdown': index.breakdown(famille, start_date, end_date, granularity),
+                }
+                for famille in ctx['familles'] if famille in index
+            }
+            if ctx['comparison']:
+                fill_comparison(ctx, numbers, granularity, query_time)
+            else:
+                item = numbers.get(ctx['famille'], EMPTY_NUMBERS)
+                fill_numbers(ctx, item['aggregates'], format_breakdown(item['breakdown']), granularity, [], query_time)
+        compute_ms[position] += (time.time() - compute_start) * 1000
+
+    # Template answers need no LLM (see needs_llm); identical prompts share one LLM call
+    prompts = {position: build_prompt(ctx) for position, _, _, use_llm, ctx, _ in pending if use_llm}
+    llm_start = time.time()
+    completions, llm_calls = await complete_prompts(prompts.values())
+    llm_wall_ms = round((time.time() - llm_start) * 1000, 2) if prompts else None
+
+    for position, _, mode, use_llm, ctx, cache_key in pending:
+        response_text, llm_time = completions.get(prompts.get(position), ("", None))
+        item_compute_ms = round(compute_ms[position], 2)
+        performance = {
+            "compute_ms": item_compute_ms,
+            "llm_ms": llm_time,
+            "total_ms": round(item_compute_ms + (llm_time or 0.0), 2),
+        }
+        results[position] = finish_answer(ctx, response_text, cache_key, USE_DATABASE, mode, use_llm, performance=performance)
+
+    total_ms = round((time.time() - batch_start) * 1000, 2)
+    print(f"Batch done in {total_ms}ms ({llm_calls} LLM calls)")
+    return {
+        "results": results,
+        "performance": {
+            "questions": len(questions),
+            "computed": len(pending),
+            "database_query_ms": query_time,
+            "database_spans": spans,
+            "llm_calls": llm_calls,
+            "llm_ms": llm_wall_ms,
+            "total_ms": total_ms
+        }
+    }
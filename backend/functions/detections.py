@@ -1,45 +1,70 @@
 from functions.normalize_text import normalize_text
-from Database.database import initialize_data_source
-from typing import Optional
-import re, difflib
+from Database.database import get_data_source
+from functions.famille_matcher import FamilleMatcher
+from functions.aliases import load_aliases, alias_file_signature, DEFAULT_ALIASES
+from typing import List, Optional
+import re, os, threading, time
 
 
-available_families, df_data = initialize_data_source()
+ALIAS_RELOAD_INTERVAL = float(os.getenv("ALIAS_RELOAD_INTERVAL", "5"))
+# "toutes les familles", "par famille", ... on normalized text
+ALL_FAMILLES_RE = re.compile(r"\b(?:TOUTES?\s+LES\s+FAMILLES|TOUTES\s+FAMILLES|CHAQUE\s+FAMILLE|PAR\s+FAMILLE|TOUS\s+LES\s+PRODUITS)\b")
 
-def detect_famille_in_text(text: str) -> Optional[str]:
-    text_norm = normalize_text(text)
+_matcher = None
+_matcher_lock = threading.Lock()
+_aliases = None
+_alias_signature = None
+_next_alias_check = 0.0
 
-    variations = {
-        normalize_text("MAIS"): normalize_text("MAIS"),
-        normalize_text("MAÏS"): normalize_text("MAIS"),
-        normalize_text("CORN"): normalize_text("MAIS"),
-        normalize_text("BLE FOURRAGER"): normalize_text("BLE FOURRAGER"),
-        normalize_text("BLED FOURRAGER"): normalize_text("BLE FOURRAGER"),
-        normalize_text("BLÉ FOURRAGER"): normalize_text("BLE FOURRAGER"),
-        normalize_text("BLÉ FOURAGER"): normalize_text("BLE FOURRAGER"),
-        normalize_text("ORG"): normalize_text("ORGE"),
-        normalize_text("SOJA"): normalize_text("GRAINES DE SOJA"),
-    }
-    
-    for variant, standard in variations.items():
-        if variant in text_norm:
-            return standard
+def reload_aliases(force=False):
+    """Re-read the alias file if it changed (or when forced); returns the active alias count"""
+    global _aliases, _alias_signature, _matcher
+    with _matcher_lock:
+        signature = alias_file_signature()
+        if force or _aliases is None or signature != _alias_signature:
+            try:
+                _aliases = load_aliases()
+                _alias_signature = signature
+                _matcher = None  # recompiled on next lookup
+                print(f"Loaded {len(_aliases)} famille aliases")
+            except (OSError, ValueError) as e:
+                # Keep serving with the previous table rather than failing requests
+                print("Alias reload failed:", e)
+                _alias_signature = signature
+                if _aliases is None:
+                    _aliases = list(DEFAULT_ALIASES)
+        return len(_aliases)
 
-    for fam in available_families:
-        if fam == text_norm or fam in text_norm:
-            return fam
+def get_famille_matcher() -> FamilleMatcher:
+    """Matcher compiled once per families list and alias table"""
+    global _matcher, _next_alias_check
+    now = time.monotonic()
+    if now >= _next_alias_check:
+        _next_alias_check = now + ALIAS_RELOAD_INTERVAL
+        reload_aliases()
+    families = get_data_source().available_families
+    matcher = _matcher
+    if matcher is None or matcher.families is not families:
+        with _matcher_lock:
+            if _matcher is None or _matcher.families is not families:
+                _matcher = FamilleMatcher(families, _aliases)
+            matcher = _matcher
+    return matcher
 
-    matches = difflib.get_close_matches(text_norm, available_families, n=1, cutoff=0.8)
-    if matches:
-        return matches[0]
-    
-    words = [w for w in re.split(r'[\s,;:.!?()]+', text_norm) if len(w) > 2]
-    for w in words:
-        matches = difflib.get_close_matches(w, available_families, n=1, cutoff=0.85)
-        if matches:
-            return matches[0]
-    
-    return None
+def detect_famille_in_text(text: str) -> Optional[str]:
+    return get_famille_matcher().match(normalize_text(text))
+
+def detect_familles_in_text(text: str) -> List[str]:
+    """Every famille mentioned (text order), or all of them for 'toutes les familles' questions"""
+    text_norm = normalize_text(text)
+    if ALL_FAMILLES_RE.search(text_norm):
+        return list(get_data_source().available_families)
+    matcher = get_famille_matcher()
+    familles = matcher.find_all(text_norm)
+    if not familles:
+        found = matcher.match(text_norm)  # fuzzy fallback
+        familles = [found] if found else []
+    return familles
 
 def detect_math_operation(text: str):
     t = text.lower()
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_CONCURRENCY = int(os.getenv("DB_CONCURRENCY", "8"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "2"))
+
+# Bounded pools so blocking sqlite3 / Ollama calls never run on the event loop
+_db_executor = ThreadPoolExecutor(max_workers=DB_CONCURRENCY, thread_name_prefix="db")
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="llm")
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database call on the database pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(func, *args, **kwargs))
+
+async def run_llm(func, *args, **kwargs):
+    """Run a blocking LLM call on the LLM pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_llm_executor, partial(func, *args, **kwargs))
+
+async def stream_llm(func, *args, **kwargs):
+    """Drive a blocking generator (e.g. llm.stream) on the LLM pool, yielding chunks as they arrive.
+
+    If the consumer goes away (client disconnect), the pump stops at the next
+    chunk and closes the generator, so the LLM thread is freed right away.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def emit(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed (shutdown); nobody is listening
+            pass
+
+    def pump():
+        chunks = None
+        try:
+            chunks = func(*args, **kwargs)
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                emit(chunk)
+        except Exception as e:
+            emit(e)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            emit(done)
+
+    future = loop.run_in_executor(_llm_executor, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                await future
+                raise item
+            yield item
+        await future
+    finally:
+        stop.set()
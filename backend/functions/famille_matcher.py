@@ -0,0 +1,168 @@
+import difflib
+import re
+from collections import deque
+from functions.normalize_text import normalize_text
+
+WORD_SPLIT = re.compile(r'[\s,;:.!?()]+')
+FULL_TEXT_CUTOFF = 0.8
+WORD_CUTOFF = 0.85
+FUZZY_MEMO_SIZE = 4096
+
+
+class FamilleMatcher:
+    """Families + aliases compiled once into an Aho-Corasick automaton, with a length-bucketed fuzzy fallback.
+
+    Lookups give the same answer as the original linear scan: aliases first (in
+    declaration order), then families (in list order), then difflib on the
+    whole text, then difflib word by word.
+    """
+
+    def __init__(self, families, aliases=()):
+        self.families = families
+        # Priority order: aliases, then families (same dict semantics as the old variations table)
+        normalized_aliases = {}
+        for variant, standard in aliases:
+            normalized_aliases[normalize_text(variant)] = normalize_text(standard)
+        patterns = list(normalized_aliases.items())
+        patterns.extend((fam, fam) for fam in families)
+        self.patterns = patterns
+        self._build_automaton()
+
+        # Fuzzy fallback: candidates bucketed by length so impossible ones are never scored
+        self._by_length = {}
+        for fam in families:
+            self._by_length.setdefault(len(fam), []).append(fam)
+        self._fuzzy_memo = {}
+
+    # -----------------------
+    # Exact (substring) matching
+    # -----------------------
+
+    def _build_automaton(self):
+        self._goto = [{}]
+        self._best = [None]
+        self._own = [None]  # pattern ending exactly at the node (no inheritance)
+        self._empty_best = None
+        for priority, (pattern, _) in enumerate(self.patterns):
+            if not pattern:
+                # '' is a substring of every text
+                if self._empty_best is None:
+                    self._empty_best = priority
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._best.append(None)
+                    self._own.append(None)
+                node = nxt
+            if self._best[node] is None or priority < self._best[node]:
+                self._best[node] = priority
+            if self._own[node] is None or priority < self._own[node]:
+                self._own[node] = priority
+
+        # Failure links (BFS); each node inherits the best priority along its suffix chain
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                inherited = self._best[self._fail[child]]
+                if inherited is not None and (self._best[child] is None or inherited < self._best[child]):
+                    self._best[child] = inherited
+                queue.append(child)
+
+    def exact_match(self, text_norm):
+        best = self._empty_best
+        node = 0
+        goto, fail, best_at = self._goto, self._fail, self._best
+        for ch in text_norm:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            found = best_at[node]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return None if best is None else self.patterns[best][1]
+
+    def find_all(self, text_norm):
+        """Every famille mentioned as whole words, in order of appearance; overlapping mentions keep the longest.
+
+        Hits inside longer words ('ORG' in 'ORGANISATION', 'MAIS' in 'MAISON')
+        are skipped, unlike exact_match which keeps the legacy substring rules.
+        """
+        spans = []
+        last = len(text_norm) - 1
+        node = 0
+        goto, fail, own = self._goto, self._fail, self._own
+        for pos, ch in enumerate(text_norm):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node
+            while hit:
+                priority = own[hit]
+                if priority is not None:
+                    pattern, famille = self.patterns[priority]
+                    start = pos + 1 - len(pattern)
+                    if (start == 0 or not text_norm[start - 1].isalnum()) and (pos == last or not text_norm[pos + 1].isalnum()):
+                        spans.append((start, -len(pattern), famille))
+                hit = fail[hit]
+        spans.sort()
+        found, covered_to = [], 0
+        for start, neg_length, famille in spans:
+            if start < covered_to:
+                continue
+            covered_to = start - neg_length
+            if famille not in found:
+                found.append(famille)
+        return found
+
+    # -----------------------
+    # Fuzzy fallback
+    # -----------------------
+
+    def close_match(self, word, cutoff):
+        """difflib.get_close_matches(word, families, n=1, cutoff)[0], skipping lengths that cannot reach cutoff"""
+        key = (word, cutoff)
+        if key in self._fuzzy_memo:
+            return self._fuzzy_memo[key]
+        lw = len(word)
+        candidates = []
+        for length, fams in self._by_length.items():
+            # Same bound difflib applies first (real_quick_ratio); filtered lengths could never match
+            total = lw + length
+            if (2.0 * min(lw, length) / total if total else 1.0) >= cutoff:
+                candidates.extend(fams)
+        matches = difflib.get_close_matches(word, candidates, n=1, cutoff=cutoff) if candidates else []
+        result = matches[0] if matches else None
+        if len(self._fuzzy_memo) >= FUZZY_MEMO_SIZE:
+            self._fuzzy_memo.clear()
+        self._fuzzy_memo[key] = result
+        return result
+
+    def match(self, text_norm):
+        found = self.exact_match(text_norm)
+        if found is not None:
+            return found
+
+        found = self.close_match(text_norm, FULL_TEXT_CUTOFF)
+        if found is not None:
+            return found
+
+        for w in WORD_SPLIT.split(text_norm):
+            if len(w) > 2:
+                found = self.close_match(w, WORD_CUTOFF)
+                if found is not None:
+                    return found
+        return None
@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+
+# -----------------------
+# Per-key latency stats
+# -----------------------
+
+
+class LatencyStats:
+    """Thread-safe latency samples per key (e.g. answer mode) over a bounded window"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._llm_calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, ms, llm_called=False):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(ms)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._llm_calls[key] = self._llm_calls.get(key, 0) + (1 if llm_called else 0)
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def stats(self):
+        with self._lock:
+            report = {}
+            for key, samples in self._samples.items():
+                ordered = sorted(samples)
+                report[key] = {
+                    "requests": self._counts[key],
+                    "llm_calls": self._llm_calls[key],
+                    "avg_ms": round(sum(ordered) / len(ordered), 2),
+                    "p50_ms": round(self._percentile(ordered, 0.5), 2),
+                    "p95_ms": round(self._percentile(ordered, 0.95), 2),
+                    "max_ms": round(ordered[-1], 2),
+                    "window": len(ordered),
+                }
+            return report
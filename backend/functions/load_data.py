@@ -1,9 +1,10 @@
 import os
 import sys
+import tempfile
+import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import pandas as pd
 from functions.normalize_text import normalize_text
 from dotenv import load_dotenv
 
@@ -11,19 +12,149 @@ load_dotenv()
 
 EXCEL_FILE = os.getenv("EXCEL_FILE")
 PARQUET_FILE = os.getenv("PARQUET_FILE")
+# Rows read, normalized and handed to the loader at a time; bounds peak memory on large extracts
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "200000"))
+SOURCE_COLUMNS = ['DATE_CONSO', 'FAMILLE', 'QTE']
 
-def load_data_pandas() -> pd.DataFrame:
-    """Original pandas approach - kept as fallback"""
+
+def pick_source_file(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE):
+    """Parquet cache unless a newer Excel extract has been dropped in"""
     if os.path.exists(PARQUET_FILE):
-        print("Loading from parquet...")
-        df = pd.read_parquet(PARQUET_FILE)
+        if EXCEL_FILE and os.path.exists(EXCEL_FILE) and os.path.getmtime(EXCEL_FILE) > os.path.getmtime(PARQUET_FILE):
+            return EXCEL_FILE
+        return PARQUET_FILE
+    return EXCEL_FILE
+
+
+# -----------------------
+# Streaming readers
+# -----------------------
+
+def iter_parquet_chunks(path, chunk_rows=INGEST_CHUNK_ROWS):
+    """Raw DataFrames of at most chunk_rows rows, read batch by batch"""
+    import pyarrow.parquet as pq
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=SOURCE_COLUMNS):
+        yield batch.to_pandas()
+
+
+def iter_excel_chunks(path, chunk_rows=INGEST_CHUNK_ROWS):
+    """Raw DataFrames of at most chunk_rows rows from the first sheet, through openpyxl's read-only row stream"""
+    import itertools
+    import openpyxl
+    import pandas as pd
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        while True:
+            block = list(itertools.islice(rows, chunk_rows))
+            if not block:
+                break
+            yield pd.DataFrame(block, columns=header)[SOURCE_COLUMNS]
+    finally:
+        workbook.close()
+
+
+def iter_source_chunks(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE, chunk_rows=INGEST_CHUNK_ROWS):
+    """Cleaned chunks of the extract, one at a time.
+
+    An Excel source is cached to parquet as it streams; the cache only
+    replaces the old one once the whole workbook has been read.
+    """
+    source = pick_source_file(PARQUET_FILE=PARQUET_FILE, EXCEL_FILE=EXCEL_FILE)
+    if source == PARQUET_FILE:
+        print("Streaming from parquet...")
+        raw_chunks = iter_parquet_chunks(PARQUET_FILE, chunk_rows)
     else:
-        print("Loading from Excel...")
-        df = pd.read_excel(EXCEL_FILE)
-        df.to_parquet(PARQUET_FILE, index=False)
+        print("Streaming from Excel...")
+        raw_chunks = iter_excel_chunks(EXCEL_FILE, chunk_rows)
+
+    clean_time = 0.0
+    rows = 0
+    cache = ParquetCache(PARQUET_FILE) if source != PARQUET_FILE else None
+    completed = False
+    try:
+        for raw in raw_chunks:
+            clean_start = time.time()
+            chunk = clean_frame(raw, log=False)
+            clean_time += time.time() - clean_start
+            rows += len(chunk)
+            if cache is not None:
+                cache.write(chunk)
+            yield chunk
+        completed = True
+    finally:
+        if cache is not None:
+            cache.close(keep=completed)
+    if completed:
+        print(f"Streamed {rows} rows in chunks of {chunk_rows} (normalization {clean_time * 1000:.2f}ms)")
+
+
+class ParquetCache:
+    """Parquet copy of an Excel extract written chunk by chunk, swapped in atomically on close.
+
+    Each cache writes its own temp file, so workers streaming the same new
+    extract never publish each other's half-written files.
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+        self.path = path
+        fd, self.tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp',
+                                             dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        self.schema = pa.schema([('DATE_CONSO', pa.date32()), ('FAMILLE', pa.string()), ('QTE', pa.float64())])
+        self.writer = None
+
+    def write(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        frame = chunk[SOURCE_COLUMNS].assign(FAMILLE=chunk['FAMILLE'].astype(str))
+        table = pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        self.writer.write_table(table)
+
+    def close(self, keep=True):
+        if self.writer is not None:
+            self.writer.close()
+            if keep:
+                os.replace(self.tmp_path, self.path)
+                return
+        os.remove(self.tmp_path)
+
+
+# -----------------------
+# Vectorized cleaning (shared by both loaders)
+# -----------------------
+
+def normalize_familles(familles):
+    """normalize_text over a FAMILLE column, run once per distinct value and mapped back by code"""
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(familles)
+    # Missing familles get code -1, which lands on the trailing None and is dropped with the other NaNs
+    normalized = np.array([normalize_text(str(value)) for value in uniques] + [None], dtype=object)
+    return pd.Series(normalized[codes], index=familles.index), len(uniques)
+
+
+def parse_quantities(quantities):
+    """QTE as float64: numeric columns are cast directly, text ones go through one vectorized ',' -> '.' pass"""
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(quantities):
+        return quantities.astype('float64')
+    return pd.to_numeric(quantities.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+
 
+def clean_frame(df, log=True):
+    """Normalize DATE_CONSO, FAMILLE_NORM and QTE of a raw extract (or chunk) and drop unusable rows"""
+    import pandas as pd
+    clean_start = time.time()
     df['DATE_CONSO'] = pd.to_datetime(df['DATE_CONSO'], errors='coerce', dayfirst=True).dt.date
-    df['FAMILLE_NORM'] = df['FAMILLE'].astype(str).apply(normalize_text)
-    df['QTE'] = pd.to_numeric(df['QTE'].astype(str).str.replace(',', '.'), errors='coerce')
+    df['FAMILLE_NORM'], famille_count = normalize_familles(df['FAMILLE'])
+    df['QTE'] = parse_quantities(df['QTE'])
     df = df.dropna(subset=['DATE_CONSO', 'FAMILLE_NORM', 'QTE']).reset_index(drop=True)
+    if log:
+        print(f"Normalized {len(df)} rows ({famille_count} distinct familles) in {(time.time() - clean_start) * 1000:.2f}ms")
     return df
\ No newline at end of file
@@ -1,52 +1,244 @@
 import re
-from dateutil import parser as dateutil_parser
+from datetime import date, timedelta
+from functions.normalize_text import normalize_text
 
-def parse_date_range_from_text(text: str):
-    text = text.strip()
-    
-    range_patterns = [
-        r'du\s+(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+(?:au|à)\s+(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
-        r'entre\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+et\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
-        r'de\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+(?:au|à|jusqu\'au|jusqu\s+au)\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
-        r'(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})\s+(?:au|à|-|jusqu\'au|jusqu\s+au)\s+(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})'
-    ]
-    
-    for pattern in range_patterns:
-        m = re.search(pattern, text, flags=re.IGNORECASE)
+# One scan finds every numeric date; connectors between neighbours decide range vs single
+DATE_TOKEN_RE = re.compile(r'(?<!\d)(\d{1,2})[\/\-.](\d{1,2})[\/\-.](\d{2,4})(?!\d)')
+RANGE_LINK_RE = re.compile(r"\s*(?:au|à|-|jusqu['’]au|jusqu\s+au)\s*(?:le\s+)?", re.IGNORECASE)
+ENTRE_LINK_RE = re.compile(r"\s+et\s+(?:le\s+)?", re.IGNORECASE)
+ENTRE_RE = re.compile(r'\bentre\b', re.IGNORECASE)
+
+def _token_to_date(m):
+    """DD/MM/YYYY directly; anything unusual (2-digit years, month > 12) goes through dateutil"""
+    day, month, year = m.group(1), m.group(2), m.group(3)
+    if len(year) == 4:
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            pass
+    try:
+        from dateutil import parser as dateutil_parser
+        return dateutil_parser.parse(m.group(0), dayfirst=True).date()
+    except (ValueError, OverflowError):
+        return None
+
+def _is_range_link(text, first, second):
+    gap = text[first.end():second.start()]
+    if RANGE_LINK_RE.fullmatch(gap):
+        return True
+    # "entre le X et le Y"
+    return ENTRE_LINK_RE.fullmatch(gap) is not None and ENTRE_RE.search(text, 0, first.start()) is not None
+
+# -----------------------
+# Relative and calendar expressions
+# -----------------------
+
+MONTHS = {
+    'JANVIER': 1, 'FEVRIER': 2, 'MARS': 3, 'AVRIL': 4, 'MAI': 5, 'JUIN': 6,
+    'JUILLET': 7, 'AOUT': 8, 'SEPTEMBRE': 9, 'OCTOBRE': 10, 'NOVEMBRE': 11, 'DECEMBRE': 12,
+}
+ORDINALS = {
+    '1': 1, '1ER': 1, '1E': 1, '1ERE': 1, 'PREMIER': 1,
+    '2': 2, '2E': 2, '2EME': 2, 'DEUXIEME': 2, 'SECOND': 2,
+    '3': 3, '3E': 3, '3EME': 3, 'TROISIEME': 3,
+    '4': 4, '4E': 4, '4EME': 4, 'QUATRIEME': 4,
+}
+_MONTH = '|'.join(MONTHS)
+_ORDINAL = '|'.join(sorted(ORDINALS, key=len, reverse=True))
+_LAST = r"(?:DERNIER|DERNIERE|PASSE|PASSEE|PRECEDENT|PRECEDENTE)"
+
+# Most specific alternatives first; matched on normalize_text() output (upper case, no accents)
+CALENDAR_RE = re.compile(
+    r"\b(?:"
+    rf"(?P<before_yesterday>AVANT[- ]HIER)"
+    rf"|(?P<yesterday>HIER)"
+    rf"|(?P<today>AUJOURD['’ ]?HUI)"
+    rf"|SEMAINE\s+(?:N[O°]?\s*)?(?P<week>\d{{1,2}})(?:\s+(?:DE\s+)?(?P<week_year>\d{{4}}))?"
+    rf"|(?P<this_week>CETTE\s+SEMAINE)"
+    rf"|(?P<last_week>(?:LA\s+)?SEMAINE\s+{_LAST})"
+    rf"|(?:MOIS\s+(?:DE\s+|D['’])?|EN\s+)?(?P<month>{_MONTH})(?:\s+(?P<month_year>\d{{4}}))?"
+    rf"|(?P<this_month>CE\s+MOIS)"
+    rf"|(?P<last_month>(?:LE\s+)?MOIS\s+{_LAST})"
+    rf"|T(?P<quarter_t>[1-4])(?:\s+(?P<quarter_t_year>\d{{4}}))?"
+    rf"|(?P<quarter_ord>{_ORDINAL})\s+TRIMESTRE(?:\s+(?:DE\s+)?(?P<quarter_ord_year>\d{{4}}))?"
+    rf"|TRIMESTRE\s+(?P<quarter_num>[1-4])(?:\s+(?:DE\s+)?(?P<quarter_num_year>\d{{4}}))?"
+    rf"|(?P<this_quarter>CE\s+TRIMESTRE)"
+    rf"|(?P<last_quarter>(?:LE\s+)?TRIMESTRE\s+{_LAST})"
+    rf"|(?:ANNEE|EN|AN)\s+(?P<year>\d{{4}})"
+    rf"|(?P<this_year>CETTE\s+ANNEE)"
+    rf"|(?P<last_year>(?:L['’ ]?)?(?:ANNEE|AN)\s+{_LAST})"
+    r")\b"
+)
+
+# Written-out dates: "le 15 mars 2024", "du 1er juin au 15 juin 2024", "de janvier à mars 2024"
+_DAY = r"\d{1,2}(?:ER|ERE|E)?|PREMIER"
+_YEAR = r"\d{4}"
+_SPAN_LINK = r"(?:\s+(?:AU|A|ET|JUSQU['’ ]?AU|JUSQU['’ ]?A)\s+|\s*-\s*)"
+_MONTH_PREFIX = r"(?:(?:LE\s+)?MOIS\s+(?:DE\s+|D['’])?)?"
+
+DAY_SPAN_RE = re.compile(
+    rf"\b(?:DU|ENTRE)\s+(?:LE\s+)?(?P<d1>{_DAY})(?:\s+(?P<m1>{_MONTH})(?:\s+(?P<y1>{_YEAR}))?)?"
+    rf"{_SPAN_LINK}(?:LE\s+)?(?P<d2>{_DAY})\s+(?P<m2>{_MONTH})(?:\s+(?P<y2>{_YEAR}))?\b"
+)
+MONTH_SPAN_RE = re.compile(
+    rf"\b(?:DU|DE|D['’]|ENTRE)\s*{_MONTH_PREFIX}(?P<m1>{_MONTH})(?:\s+(?P<y1>{_YEAR}))?"
+    rf"{_SPAN_LINK}{_MONTH_PREFIX}(?P<m2>{_MONTH})(?:\s+(?P<y2>{_YEAR}))?\b"
+)
+DAY_DATE_RE = re.compile(rf"\b(?P<day>{_DAY})\s+(?P<month>{_MONTH})(?:\s+(?P<year>{_YEAR}))?\b")
+MONTH_NAME_RE = re.compile(rf"\b(?:{_MONTH})\b")
+
+def _day_number(token):
+    return 1 if token == 'PREMIER' else int(re.match(r'\d+', token).group())
+
+def _span_years(first, y1, last, y2, today):
+    """Years of a (month, day) -> (month, day) span; a missing year follows the other end,
+    and with none at all the span starts at the latest such day that has passed"""
+    if y1 and y2:
+        return int(y1), int(y2)
+    if y2:
+        return (int(y2) if first <= last else int(y2) - 1), int(y2)
+    if y1:
+        start_year = int(y1)
+    else:
+        start_year = today.year if first <= (today.month, today.day) else today.year - 1
+    return start_year, (start_year if first <= last else start_year + 1)
+
+def _parse_written_date(text_norm, today):
+    """(start, end, type) for a written-out date or span, None when there is none.
+
+    An invalid date ("31 février") gives (None, None, None) rather than falling
+    back to the bare month.
+    """
+    try:
+        m = DAY_SPAN_RE.search(text_norm)
         if m:
-            try:
-                d1 = dateutil_parser.parse(m.group(1), dayfirst=True).date()
-                d2 = dateutil_parser.parse(m.group(2), dayfirst=True).date()
-                return (min(d1, d2), max(d1, d2), 'range')
-            except:
-                continue
-    
-    single_date_patterns = [
-        r'(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})(?!\s*(?:au|à|-|jusqu))',
-        r'(?:au|à)\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})(?!\s*(?:au|à|-|jusqu))',
-        r'pour\s+(?:le\s+)?(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})',
-    ]
-    
-    for pattern in single_date_patterns:
-        m = re.search(pattern, text, flags=re.IGNORECASE)
+            d1, d2 = _day_number(m['d1']), _day_number(m['d2'])
+            m2 = MONTHS[m['m2']]
+            m1 = MONTHS[m['m1']] if m['m1'] else m2
+            y1, y2 = _span_years((m1, d1), m['y1'], (m2, d2), m['y2'], today)
+            return (date(y1, m1, d1), date(y2, m2, d2), 'range')
+        m = MONTH_SPAN_RE.search(text_norm)
         if m:
-            try:
-                d = dateutil_parser.parse(m.group(1), dayfirst=True).date()
-                return (d, d, 'single')
-            except:
-                continue
-    
-    dates = re.findall(r'\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4}', text)
-    parsed = []
-    for ds in dates:
-        try:
-            parsed.append(dateutil_parser.parse(ds, dayfirst=True).date())
-        except:
-            continue
-    
-    if len(parsed) >= 2:
-        return (min(parsed[0], parsed[1]), max(parsed[0], parsed[1]), 'range')
-    elif len(parsed) == 1:
-        return (parsed[0], parsed[0], 'single')
-    
-    return (None, None, None)
\ No newline at end of file
+            m1, m2 = MONTHS[m['m1']], MONTHS[m['m2']]
+            y1, y2 = _span_years((m1, 1), m['y1'], (m2, 1), m['y2'], today)
+            return (_month_range(y1, m1)[0], _month_range(y2, m2)[1], 'range')
+        m = DAY_DATE_RE.search(text_norm)
+        if m:
+            day, month = _day_number(m['day']), MONTHS[m['month']]
+            year = int(m['year']) if m['year'] else _span_years((month, day), None, (month, day), None, today)[0]
+            d = date(year, month, day)
+            return (d, d, 'single')
+    except ValueError:
+        return (None, None, None)
+    return None
+
+def _month_range(year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end - timedelta(days=1)
+
+def _quarter_range(year, quarter):
+    start, _ = _month_range(year, 3 * quarter - 2)
+    _, end = _month_range(year, 3 * quarter)
+    return start, end
+
+def _week_range(monday):
+    return monday, monday + timedelta(days=6)
+
+def parse_calendar_expression(text: str, today=None):
+    """Resolve 'hier', 'semaine 23', 'mois de juin 2024', 'T2 2024', 'année 2023'... to calendar-aligned ranges"""
+    today = today or date.today()
+    text_norm = normalize_text(text)
+    written = _parse_written_date(text_norm, today)
+    if written is not None:
+        return written
+    m = CALENDAR_RE.search(text_norm)
+    if not m:
+        return (None, None, None)
+    g = m.groupdict()
+    try:
+        if g['before_yesterday']:
+            d = today - timedelta(days=2)
+            return (d, d, 'single')
+        if g['yesterday']:
+            d = today - timedelta(days=1)
+            return (d, d, 'single')
+        if g['today']:
+            return (today, today, 'single')
+        if g['week']:
+            year = int(g['week_year'] or today.year)
+            start, end = _week_range(date.fromisocalendar(year, int(g['week']), 1))
+        elif g['this_week']:
+            start, end = _week_range(today - timedelta(days=today.weekday()))
+        elif g['last_week']:
+            start, end = _week_range(today - timedelta(days=today.weekday() + 7))
+        elif g['month']:
+            month = MONTHS[g['month']]
+            # "mai ... juin 2024", "juin ... T3": more than one period named, refuse to guess
+            rest = text_norm[m.end():]
+            following = CALENDAR_RE.search(rest)
+            if MONTH_NAME_RE.search(rest) or (following and not following['this_year']):
+                return (None, None, None)
+            if g['month_year']:
+                year = int(g['month_year'])
+            elif following:
+                # "juin de cette année"
+                year = today.year
+            else:
+                # Without a year: the latest such month that has started
+                year = today.year if month <= today.month else today.year - 1
+            start, end = _month_range(year, month)
+        elif g['this_month']:
+            start, end = _month_range(today.year, today.month)
+        elif g['last_month']:
+            previous = today.replace(day=1) - timedelta(days=1)
+            start, end = _month_range(previous.year, previous.month)
+        elif g['quarter_t'] or g['quarter_ord'] or g['quarter_num']:
+            if g['quarter_t']:
+                quarter, year = int(g['quarter_t']), g['quarter_t_year']
+            elif g['quarter_ord']:
+                quarter, year = ORDINALS[g['quarter_ord']], g['quarter_ord_year']
+            else:
+                quarter, year = int(g['quarter_num']), g['quarter_num_year']
+            start, end = _quarter_range(int(year or today.year), quarter)
+        elif g['this_quarter']:
+            start, end = _quarter_range(today.year, (today.month - 1) // 3 + 1)
+        elif g['last_quarter']:
+            quarter = (today.month - 1) // 3
+            year = today.year if quarter else today.year - 1
+            start, end = _quarter_range(year, quarter or 4)
+        elif g['year']:
+            start, end = date(int(g['year']), 1, 1), date(int(g['year']), 12, 31)
+        elif g['this_year']:
+            start, end = date(today.year, 1, 1), date(today.year, 12, 31)
+        elif g['last_year']:
+            start, end = date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+        else:
+            return (None, None, None)
+    except ValueError:
+        # e.g. "semaine 54"
+        return (None, None, None)
+    return (start, end, 'range')
+
+def parse_date_range_from_text(text: str, today=None):
+    """Return (start, end, 'range' | 'single') or (None, None, None).
+
+    Explicit numeric dates win; otherwise relative/calendar expressions are resolved
+    against today (injectable for tests).
+    """
+    text = text.strip()
+
+    tokens = [(m, _token_to_date(m)) for m in DATE_TOKEN_RE.finditer(text)]
+    if not tokens:
+        return parse_calendar_expression(text, today=today)
+
+    # First pair of neighbouring dates joined by "au", "à", "-", "jusqu'au" or "entre ... et"
+    for (m1, d1), (m2, d2) in zip(tokens, tokens[1:]):
+        if d1 is not None and d2 is not None and _is_range_link(text, m1, m2):
+            return (min(d1, d2), max(d1, d2), 'range')
+
+    for _, d in tokens:
+        if d is not None:
+            return (d, d, 'single')
+
+    return parse_calendar_expression(text, today=today)
@@ -1,15 +1,21 @@
 from functions.normalize_text import normalize_text
 from functions.parse_date import parse_date_range_from_text
-from functions.detections import detect_famille_in_text, detect_math_operation
+from functions.detections import detect_familles_in_text, detect_math_operation
 import time
-from Models.model import initialize_llm_model
+from Models.model import get_llm
+from Models.llm_cache import llm_cache, invoke_and_cache, lookup_completion
 from pydantic import BaseModel
-from Database.database import initialize_data_source, query_consumption_data
-import pandas as pd
-from datetime import datetime
+from Database.database import get_data_source, data_source_ready, query_consumption_data, query_consumption_by_famille, register_ingest_listener
+from datetime import date
 from functions.operations import perform_operation
+from functions.executors import run_db, run_llm, stream_llm
+from functions.cache import TTLCache
+from functions.latency import LatencyStats
 from typing import Optional
-available_families, df_data = initialize_data_source()
+from contextlib import aclosing
+import json
+import os
+import re
 
 
 
@@ -20,174 +26,521 @@ available_families, df_data = initialize_data_source()
 class Question(BaseModel):
     question: str
     mode: Optional[str] = None
+    include_rows: bool = False
+    granularity: Optional[str] = None  # 'day' | 'month'; None picks by range length
 
-llm = initialize_llm_model()
 
-async def query_exact(q: Question,USE_DATABASE, AGGREGATION_STRATEGY):
-    start_time = time.time()
-    q_text: str = q.question or ""
-    mode = (q.mode or AGGREGATION_STRATEGY or "hybrid").lower()
-    debug_info: dict = {}
+# -----------------------
+# Answer modes
+# -----------------------
+
+# server: template only; hybrid: LLM only when the template can't phrase it; llm: always the LLM
+MODES = ("server", "hybrid", "llm")
+# Matched on the normalized question: explanations, trends, advice...
+LLM_TRIGGER_RE = re.compile(
+    r"\b(?:POURQUOI|EXPLIQU\w*|EXPLICATION\w*|ANALYS\w*|TENDANCE\w*|EVOLU\w*|INTERPRET\w*"
+    r"|RESUM\w*|COMMENT\w*|CONSEIL\w*|RECOMMAND\w*|PREVI\w*|PREDI\w*|ANORMAL\w*|ANOMALI\w*|CAUSE\w*)\b"
+)
+MODE_STATS_WINDOW = int(os.getenv("MODE_STATS_WINDOW", "1000"))
+mode_latency = LatencyStats(window=MODE_STATS_WINDOW)
+
+
+def resolve_mode(q, AGGREGATION_STRATEGY):
+    """Per-question mode, else the server default; unknown values fall back to hybrid"""
+    mode = (q.mode or AGGREGATION_STRATEGY or "hybrid").strip().lower()
+    return mode if mode in MODES else "hybrid"
+
+
+def needs_llm(ctx, mode):
+    if mode == "server":
+        return False
+    if mode == "llm":
+        return True
+    return LLM_TRIGGER_RE.search(ctx['debug_info']['normalized_question']) is not None
+
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+answer_cache = TTLCache(maxsize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+
+def error_response(ctx, message, **extra):
+    execution_time = round(time.time() - ctx['start_time'], 2)
+    return {
+        "response": message,
+        "debug": ctx['debug_info'],
+        **extra,
+        "execution_time": f"{execution_time} secondes"
+    }
+
+
+def parse_question(q: Question):
+    """Parse dates, famille and operation; returns (ctx, None) or (None, error response)"""
+    ctx = {'start_time': time.time(), 'q_text': q.question or "", 'debug_info': {}}
+    q_text = ctx['q_text']
+    debug_info = ctx['debug_info']
 
     print("\nQUERY START:", q_text)
     
     # Parse dates & family
     start_date, end_date, date_type = parse_date_range_from_text(q_text)
 
-    famille = detect_famille_in_text(q_text)
+    # Whole-word mentions, else the matcher's substring/fuzzy pick; several make a comparison
+    familles = detect_familles_in_text(q_text)
+    famille = familles[0] if len(familles) == 1 else None
     
     debug_info['normalized_question'] = normalize_text(q_text)
     debug_info['parsed_start'] = str(start_date) if start_date else None
     debug_info['parsed_end'] = str(end_date) if end_date else None
     debug_info['date_type'] = date_type
-    debug_info['detected_family'] = famille
+    debug_info['detected_family'] = famille or ", ".join(familles) or None
+    debug_info['detected_families'] = familles
 
     if not start_date or not end_date:
-        execution_time = round(time.time() - start_time, 2)
-        return {
-            "response": "Erreur: Date non trouvée. Formats acceptés: '03/06/2024', 'le 03/06/2024', 'au 03/06/2024', 'du 01/06/2024 au 30/06/2024'",
-            "debug": debug_info,
-            "execution_time": f"{execution_time} secondes"
+        return None, error_response(
+            ctx, "Erreur: Date non trouvée. Formats acceptés: '03/06/2024', 'le 03/06/2024', 'au 03/06/2024', 'du 01/06/2024 au 30/06/2024'"
+        )
+
+    if not familles:
+        available_families = get_data_source().available_families
+        return None, error_response(
+            ctx, "Famille non trouvée. Familles disponibles: " + ", ".join(available_families[:5]) + "...",
+            available_families_sample=available_families[:15]
+        )
+
+    ctx.update({
+        'start_date': start_date, 'end_date': end_date, 'date_type': date_type, 'famille': famille,
+        'familles': familles, 'comparison': len(familles) > 1,
+        'operation': detect_math_operation(q_text),
+        'granularity': q.granularity,
+    })
+    return ctx, None
+
+
+def answer_cache_key(ctx, use_llm, include_rows):
+    """Cache key on the parsed intent; template answers are shared across wordings and modes.
+
+    LLM prose answers the question as worded ('pourquoi' vs 'tendance'), so its
+    key also carries the normalized question.
+    """
+    operation = ctx['operation']
+    question = ctx['debug_info']['normalized_question'] if use_llm else None
+    return (ctx['famille'] or tuple(ctx['familles']), ctx['start_date'], ctx['end_date'], ctx['date_type'],
+            operation['op'], operation['value'], 'llm' if use_llm else 'template', include_rows, ctx['granularity'],
+            question)
+
+
+def invalidate_answers(first_date):
+    """Ingest hook: forget answers whose range reaches the (re)loaded days"""
+    if first_date is None:
+        answer_cache.invalidate()
+    else:
+        first_day = date.fromisoformat(first_date)
+        answer_cache.invalidate(lambda key: key[2] >= first_day)
+
+register_ingest_listener(invalidate_answers)
+
+
+def format_period(period):
+    """'YYYY-MM-DD' -> 'dd/mm/YYYY', 'YYYY-MM' -> 'mm/YYYY' (plain slicing, no datetime parsing)"""
+    if len(period) == 7:
+        return f"{period[5:7]}/{period[:4]}"
+    return f"{period[8:10]}/{period[5:7]}/{period[:4]}"
+
+
+def cached_answer(cached, ctx, USE_DATABASE, mode):
+    """Re-stamp a cached response with this request's debug info and timings"""
+    execution_time = round(time.time() - ctx['start_time'], 2)
+    mode_latency.record(mode, (time.time() - ctx['start_time']) * 1000)
+    return {
+        **cached,
+        "debug": ctx['debug_info'],
+        "execution_time": f"{execution_time} secondes",
+        "performance": {
+            "database_query_ms": 0.0 if USE_DATABASE else None,
+            "total_ms": round(execution_time * 1000, 2),
+            "mode": mode,
+            "cache_hit": True
         }
+    }
 
-    if not famille:
-        execution_time = round(time.time() - start_time, 2)
-        return {
-            "response": "Famille non trouvée. Familles disponibles: " + ", ".join(available_families[:5]) + "...",
-            "debug": debug_info,
-            "available_families_sample": available_families[:15],
-            "execution_time": f"{execution_time} secondes"
+
+def combine_aggregates(aggregates_list):
+    """Overall sum/mean/min/max/count across several familles"""
+    present = [a for a in aggregates_list if a['count'] > 0]
+    if not present:
+        return {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}
+    total = sum(a['sum'] for a in present)
+    count = sum(a['count'] for a in present)
+    return {
+        'sum': total,
+        'mean': total / count,
+        'min': min(a['min'] for a in present),
+        'max': max(a['max'] for a in present),
+        'count': count
+    }
+
+
+def format_breakdown(rows):
+    """Breakdown rows (ISO periods, date order) -> {'dd/mm/YYYY' | 'mm/YYYY': {'total', 'entries'}}"""
+    return {
+        format_period(row['period']): {'total': round(row['total'], 2), 'entries': row['entries']}
+        for row in rows
+    }
+
+
+def fill_numbers(ctx, aggregates, daily_breakdown, granularity, rows_preview, query_time):
+    """Apply the requested operation and store the numbers on ctx"""
+    op_result, op_explanation = perform_operation(aggregates, ctx['operation'])
+    ctx.update({
+        'aggregates': aggregates, 'rows_preview': rows_preview, 'daily_breakdown': daily_breakdown,
+        'breakdown_granularity': granularity,
+        'op_result': op_result, 'op_explanation': op_explanation, 'query_time': query_time,
+    })
+    return ctx
+
+
+def fill_comparison(ctx, famille_results, granularity, query_time):
+    """Per-famille numbers and operation results, plus the combined totals, stored on ctx"""
+    per_famille = {}
+    for famille in ctx['familles']:
+        item = famille_results.get(famille) or {'aggregates': {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}, 'breakdown': []}
+        op_result, op_explanation = perform_operation(item['aggregates'], ctx['operation'])
+        per_famille[famille] = {
+            'aggregates': item['aggregates'],
+            'breakdown': format_breakdown(item['breakdown']),
+            'op_result': op_result,
+            'op_explanation': op_explanation,
         }
 
+    aggregates = combine_aggregates([item['aggregates'] for item in per_famille.values()])
+    ctx['per_famille'] = per_famille
+    return fill_numbers(ctx, aggregates, {}, granularity, [], query_time)
+
+
+async def compute_comparison(ctx, USE_DATABASE):
+    """Aggregates for every famille of a comparison question in one grouped query"""
+    familles = ctx['familles']
+    all_familles = familles == get_data_source().available_families
+    query_start = time.time()
+    data_result = await run_db(
+        query_consumption_by_famille, start_date=ctx['start_date'], end_date=ctx['end_date'],
+        familles=None if all_familles else familles, USE_DATABASE=USE_DATABASE, granularity=ctx['granularity']
+    )
+    query_time = round((time.time() - query_start) * 1000, 2)
+    print(f"Grouped query for {len(familles)} families took: {query_time}ms")
+    return fill_comparison(ctx, data_result['familles'], data_result['granularity'], query_time)
+
+
+async def compute_numbers(ctx, USE_DATABASE, include_rows=False):
+    """Fetch aggregates/breakdown for a parsed question and apply the requested operation"""
+    if ctx['comparison']:
+        return await compute_comparison(ctx, USE_DATABASE)
+
+    start_date, end_date, famille = ctx['start_date'], ctx['end_date'], ctx['famille']
+
     # OPTIMIZED: Query data using fast database approach
     query_start = time.time()
-    data_result = query_consumption_data(start_date=start_date, end_date=end_date, famille=famille, USE_DATABASE=USE_DATABASE)
+    data_result = await run_db(query_consumption_data, start_date=start_date, end_date=end_date, famille=famille, USE_DATABASE=USE_DATABASE, include_rows=include_rows, granularity=ctx['granularity'])
     query_time = round((time.time() - query_start) * 1000, 2)
     print(f"Database query took: {query_time}ms")
 
-    if USE_DATABASE:
-        aggregates = data_result['aggregates']
-        rows_preview = data_result['sample_rows']
-        daily_data = data_result['daily_breakdown']
-        
-        # Convert daily breakdown to expected format
-        daily_breakdown = {}
-        for item in daily_data:
-            date_str = datetime.strptime(str(item['date']), '%Y-%m-%d').strftime('%d/%m/%Y')
-            daily_breakdown[date_str] = {
-                'total': round(item['total'], 2),
-                'entries': item['entries']
-            }
+    return fill_numbers(
+        ctx, data_result['aggregates'], format_breakdown(data_result['breakdown']),
+        data_result['granularity'], data_result['sample_rows'], query_time
+    )
+
+
+def period_text(ctx):
+    if ctx['date_type'] == 'single':
+        return f"le {ctx['start_date'].strftime('%d/%m/%Y')}"
+    return f"du {ctx['start_date'].strftime('%d/%m/%Y')} au {ctx['end_date'].strftime('%d/%m/%Y')}"
+
+
+def ranked_familles(ctx):
+    """Comparison rows, largest consumption first"""
+    return sorted(ctx['per_famille'].items(), key=lambda item: item[1]['aggregates']['sum'], reverse=True)
+
+
+def build_comparison_prompt(ctx):
+    """One prompt covering every famille of the comparison"""
+    lines = "; ".join(
+        f"{famille}: {item['aggregates']['sum']:.2f} unités ({item['aggregates']['count']} entrées)"
+        for famille, item in ranked_familles(ctx)
+    )
+    prompt = f"Comparaison de la consommation {period_text(ctx)}: {lines}. Question: {ctx['q_text']}. Réponds brièvement."
+    if ctx['op_result'] is not None:
+        prompt += f" Opération sur le total: {ctx['op_explanation']}"
+    return prompt
+
+
+def build_prompt(ctx):
+    """Simplified prompt to reduce LLM processing time"""
+    if ctx['comparison']:
+        return build_comparison_prompt(ctx)
+    famille, aggregates = ctx['famille'], ctx['aggregates']
+    start_date, end_date = ctx['start_date'], ctx['end_date']
+    if ctx['date_type'] == 'single':
+        prompt = f"Consommation de {famille} le {start_date.strftime('%d/%m/%Y')}: {aggregates['sum']:.2f} unités ({aggregates['count']} entrées). Question: {ctx['q_text']}. Réponds brièvement."
     else:
-        # Pandas fallback
-        df_range = data_result
-        aggregates = {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}
-        rows_preview = []
-        daily_breakdown = {}
-        
-        if not df_range.empty:
-            values_list = df_range['QTE'].astype(float).tolist()
-            aggregates['sum'] = float(sum(values_list))
-            aggregates['mean'] = float(pd.Series(values_list).mean())
-            aggregates['min'] = float(min(values_list))
-            aggregates['max'] = float(max(values_list))
-            aggregates['count'] = int(len(values_list))
+        prompt = f"Consommation de {famille} du {start_date.strftime('%d/%m/%Y')} au {end_date.strftime('%d/%m/%Y')}: {aggregates['sum']:.2f} unités ({aggregates['count']} entrées). Question: {ctx['q_text']}. Réponds brièvement."
+    
+    if ctx['op_result'] is not None:
+        prompt += f" Opération: {ctx['op_explanation']}"
+    return prompt
+
+
+def comparison_template_response(ctx):
+    """Templated French comparison, one line per famille"""
+    aggregates = ctx['aggregates']
+    if aggregates['count'] == 0:
+        return f"Aucune consommation trouvée {period_text(ctx)} pour: {', '.join(ctx['familles'])}."
+    response_text = f"Comparaison de la consommation {period_text(ctx)}:"
+    for famille, item in ranked_familles(ctx):
+        famille_aggregates = item['aggregates']
+        if famille_aggregates['count'] > 0:
+            response_text += f"\n- {famille}: {famille_aggregates['sum']:.2f} unités ({famille_aggregates['count']} entrées)"
+        else:
+            response_text += f"\n- {famille}: aucune consommation"
+    response_text += f"\n\nTotal: {aggregates['sum']:.2f} unités ({aggregates['count']} entrées)."
+    if ctx['op_result'] is not None:
+        response_text += f"\n\n{ctx['op_explanation']} = {ctx['op_result']:.2f} unités."
+    return response_text
+
+
+def template_response(ctx):
+    """Templated French answer used when the LLM is unavailable or too short"""
+    if ctx['comparison']:
+        return comparison_template_response(ctx)
+    famille, aggregates, daily_breakdown = ctx['famille'], ctx['aggregates'], ctx['daily_breakdown']
+    start_date, end_date, date_type = ctx['start_date'], ctx['end_date'], ctx['date_type']
+    op_result, op_explanation = ctx['op_result'], ctx['op_explanation']
+    if date_type == 'single':
+        date_str = start_date.strftime("%d/%m/%Y")
+        if aggregates['count'] > 0:
+            response_text = f"La consommation de {famille} le {date_str} est de {aggregates['sum']:.2f} unités"
+            if aggregates['count'] > 1:
+                response_text += f" (sur {aggregates['count']} entrées)"
+            response_text += "."
+            
+            if op_result is not None:
+                response_text += f" {op_explanation} = {op_result:.2f} unités."
+        else:
+            response_text = f"Aucune consommation de {famille} trouvée pour le {date_str}."
+    else:
+        start_str = start_date.strftime("%d/%m/%Y")
+        end_str = end_date.strftime("%d/%m/%Y")
+        if aggregates['count'] > 0:
+            response_text = f"La consommation totale de {famille} du {start_str} au {end_str} est de {aggregates['sum']:.2f} unités ({aggregates['count']} entrées)."
             
-            for _, r in df_range.head(100).iterrows():
-                rows_preview.append({
-                    'DATE_CONSO': r['DATE_CONSO'].strftime("%Y-%m-%d"),
-                    'FAMILLE_NORM': r['FAMILLE_NORM'],
-                    'QTE': round(float(r['QTE']), 2)
-                })
+            if daily_breakdown and len(daily_breakdown) <= 10:  # Only show the breakdown for reasonable ranges
+                response_text += "\n\nDétail par mois:" if ctx['breakdown_granularity'] == 'month' else "\n\nDétail par jour:"
+                for date_str, data in daily_breakdown.items():
+                    entries_text = f" ({data['entries']} entrées)" if data['entries'] > 1 else ""
+                    response_text += f"\n- {date_str}: {data['total']:.2f} unités{entries_text}"
             
-            if date_type == 'range':
-                daily_summary = df_range.groupby('DATE_CONSO')['QTE'].agg(['sum', 'count']).reset_index()
-                for _, row in daily_summary.iterrows():
-                    date_str = row['DATE_CONSO'].strftime('%d/%m/%Y')
-                    daily_breakdown[date_str] = {
-                        'total': round(float(row['sum']), 2),
-                        'entries': int(row['count'])
-                    }
-
-    # Detect requested operation
-    operation = detect_math_operation(q_text)
-    op_result, op_explanation = perform_operation(aggregates, operation)
+            if op_result is not None:
+                response_text += f"\n\n{op_explanation} = {op_result:.2f} unités."
+        else:
+            response_text = f"Aucune consommation de {famille} trouvée entre le {start_str} et le {end_str}."
+    return response_text
+
+
+def round_result(op_result):
+    return round(op_result, 2) if op_result is not None and isinstance(op_result, (int, float)) else None
+
+
+def build_computed(ctx):
+    aggregates, op_result = ctx['aggregates'], ctx['op_result']
+    computed = {
+        "sum": round(aggregates['sum'], 2),
+        "mean": round(aggregates['mean'], 2),
+        "min": round(aggregates['min'], 2),
+        "max": round(aggregates['max'], 2),
+        "count": aggregates['count'],
+        "date_type": ctx['date_type'],
+        "daily_breakdown": ctx['daily_breakdown'] if ctx['date_type'] == 'range' else None,
+        "breakdown_granularity": ctx['breakdown_granularity'],
+        "operation_requested": ctx['operation'],
+        "operation_result": round_result(op_result),
+        "operation_explanation": ctx['op_explanation']
+    }
+    if ctx['comparison']:
+        computed["familles"] = {
+            famille: {
+                "sum": round(item['aggregates']['sum'], 2),
+                "mean": round(item['aggregates']['mean'], 2),
+                "min": round(item['aggregates']['min'], 2),
+                "max": round(item['aggregates']['max'], 2),
+                "count": item['aggregates']['count'],
+                "daily_breakdown": item['breakdown'] if ctx['date_type'] == 'range' else None,
+                "operation_result": round_result(item['op_result']),
+            }
+            for famille, item in ctx['per_famille'].items()
+        }
+    return computed
+
+
+def build_performance(ctx, USE_DATABASE):
+    execution_time = round(time.time() - ctx['start_time'], 2)
+    print(f"TOTAL EXECUTION TIME: {execution_time} seconds")
+    return execution_time, {
+        "database_query_ms": ctx['query_time'],
+        "total_ms": round(execution_time * 1000, 2)
+    }
+
+
+def finish_answer(ctx, response_text, cache_key, USE_DATABASE, mode, use_llm, performance=None, **performance_extra):
+    """Final response (template if the LLM was skipped, failed or too short), stored in the answer cache.
+
+    A template standing in for a failed LLM call is not cached, so the LLM is
+    asked again once it is back. performance replaces the wall-clock timings
+    when the caller (batch) measured the question's own work itself.
+    """
+    llm_answered = bool(response_text) and len(response_text.strip()) >= 10
+    # Fast fallback if LLM fails
+    if not llm_answered:
+        response_text = template_response(ctx)
+
+    if performance is None:
+        execution_time, performance = build_performance(ctx, USE_DATABASE)
+        elapsed_ms = (time.time() - ctx['start_time']) * 1000
+    else:
+        elapsed_ms = performance['total_ms']
+        execution_time = round(elapsed_ms / 1000, 2)
+    performance.update(performance_extra, mode=mode, llm_called=use_llm)
+    mode_latency.record(mode, elapsed_ms, llm_called=use_llm)
+
+    result = {
+        "computed": build_computed(ctx),
+        "rows": ctx['rows_preview'],
+        "response": response_text,
+        "debug": ctx['debug_info'],
+        "execution_time": f"{execution_time} secondes",
+        "performance": performance
+    }
+    if llm_answered or not use_llm:
+        answer_cache.set(cache_key, {"computed": result["computed"], "rows": result["rows"], "response": response_text})
+    return result
+
+
+async def query_exact(q: Question,USE_DATABASE, AGGREGATION_STRATEGY):
+    mode = resolve_mode(q, AGGREGATION_STRATEGY)
+    if not data_source_ready():
+        # Fast-startup mode: wait for the data off the event loop
+        await run_db(get_data_source)
+    ctx, error = parse_question(q)
+    if error is not None:
+        return error
+
+    use_llm = needs_llm(ctx, mode)
+    cache_key = answer_cache_key(ctx, use_llm, q.include_rows)
+    cached = answer_cache.get(cache_key)
+    if cached is not None:
+        print("Answer cache hit")
+        return cached_answer(cached, ctx, USE_DATABASE, mode)
+
+    await compute_numbers(ctx, USE_DATABASE, include_rows=q.include_rows)
 
     # Build simplified prompt (less verbose)
     llm_start = time.time()
+    llm_time = None
     response_text = ""
-    
-    if llm is not None:
+    if use_llm:
         try:
-            # Simplified prompt to reduce LLM processing time
-            if date_type == 'single':
-                prompt = f"Consommation de {famille} le {start_date.strftime('%d/%m/%Y')}: {aggregates['sum']:.2f} unités ({aggregates['count']} entrées). Question: {q_text}. Réponds brièvement."
-            else:
-                prompt = f"Consommation de {famille} du {start_date.strftime('%d/%m/%Y')} au {end_date.strftime('%d/%m/%Y')}: {aggregates['sum']:.2f} unités ({aggregates['count']} entrées). Question: {q_text}. Réponds brièvement."
-            
-            if op_result is not None:
-                prompt += f" Opération: {op_explanation}"
-            
-            response_text = llm.invoke(prompt).strip()
-            llm_time = round((time.time() - llm_start) * 1000, 2)
-            print(f"LLM processing took: {llm_time}ms")
+            prompt = build_prompt(ctx)
+            # Only cache misses go to the (small) LLM pool
+            completion = await lookup_completion(prompt)
+            if completion is None:
+                llm = await run_llm(get_llm)
+                if llm is not None:
+                    completion = await run_llm(invoke_and_cache, llm, prompt)
+            if completion is not None:
+                response_text = completion.strip()
+                llm_time = round((time.time() - llm_start) * 1000, 2)
+                print(f"LLM processing took: {llm_time}ms")
         except Exception as e:
             print("LLM invoke error:", e)
             response_text = ""
 
-    # Fast fallback if LLM fails
-    if not response_text or len(response_text.strip()) < 10:
-        if date_type == 'single':
-            date_str = start_date.strftime("%d/%m/%Y")
-            if aggregates['count'] > 0:
-                response_text = f"La consommation de {famille} le {date_str} est de {aggregates['sum']:.2f} unités"
-                if aggregates['count'] > 1:
-                    response_text += f" (sur {aggregates['count']} entrées)"
-                response_text += "."
-                
-                if op_result is not None:
-                    response_text += f" {op_explanation} = {op_result:.2f} unités."
-            else:
-                response_text = f"Aucune consommation de {famille} trouvée pour le {date_str}."
-        else:
-            start_str = start_date.strftime("%d/%m/%Y")
-            end_str = end_date.strftime("%d/%m/%Y")
-            if aggregates['count'] > 0:
-                response_text = f"La consommation totale de {famille} du {start_str} au {end_str} est de {aggregates['sum']:.2f} unités ({aggregates['count']} entrées)."
-                
-                if daily_breakdown and len(daily_breakdown) <= 10:  # Only show daily breakdown for reasonable ranges
-                    response_text += "\n\nDétail par jour:"
-                    for date_str, data in sorted(daily_breakdown.items(), key=lambda x: datetime.strptime(x[0], '%d/%m/%Y')):
-                        entries_text = f" ({data['entries']} entrées)" if data['entries'] > 1 else ""
-                        response_text += f"\n- {date_str}: {data['total']:.2f} unités{entries_text}"
-                
-                if op_result is not None:
-                    response_text += f"\n\n{op_explanation} = {op_result:.2f} unités."
+    return finish_answer(ctx, response_text, cache_key, USE_DATABASE, mode, use_llm, llm_ms=llm_time)
+
+
+# -----------------------
+# Streaming (Server-Sent Events)
+# -----------------------
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def query_exact_stream(q: Question, USE_DATABASE, AGGREGATION_STRATEGY):
+    """SSE variant of query_exact: computed numbers first, then LLM tokens, then performance"""
+    mode = resolve_mode(q, AGGREGATION_STRATEGY)
+    if not data_source_ready():
+        # Fast-startup mode: wait for the data off the event loop
+        await run_db(get_data_source)
+    ctx, error = parse_question(q)
+    if error is not None:
+        yield sse_event("error", error)
+        return
+
+    use_llm = needs_llm(ctx, mode)
+    cache_key = answer_cache_key(ctx, use_llm, q.include_rows)
+    cached = answer_cache.get(cache_key)
+    if cached is not None:
+        answer = cached_answer(cached, ctx, USE_DATABASE, mode)
+        yield sse_event("computed", {"computed": answer["computed"], "rows": answer["rows"], "debug": answer["debug"]})
+        yield sse_event("token", {"text": answer["response"]})
+        yield sse_event("done", {k: answer[k] for k in ("response", "execution_time", "performance")})
+        return
+
+    await compute_numbers(ctx, USE_DATABASE, include_rows=q.include_rows)
+
+    yield sse_event("computed", {
+        "computed": build_computed(ctx),
+        "rows": ctx['rows_preview'],
+        "debug": ctx['debug_info']
+    })
+
+    llm_start = time.time()
+    llm_time = None
+    chunks = []
+    if use_llm:
+        try:
+            prompt = build_prompt(ctx)
+            # Only cache misses go to the (small) LLM pool
+            completion = await lookup_completion(prompt)
+            if completion is not None:
+                chunks.append(completion)
+                yield sse_event("token", {"text": completion})
             else:
-                response_text = f"Aucune consommation de {famille} trouvée entre le {start_str} et le {end_str}."
+                llm = await run_llm(get_llm)
+                if llm is not None:
+                    # aclosing: a client disconnect closes stream_llm at once, which stops its pump thread
+                    async with aclosing(stream_llm(llm.stream, prompt)) as tokens:
+                        async for chunk in tokens:
+                            chunks.append(chunk)
+                            yield sse_event("token", {"text": chunk})
+                    await run_db(llm_cache.set, prompt, "".join(chunks))
+            if chunks:
+                llm_time = round((time.time() - llm_start) * 1000, 2)
+                print(f"LLM streaming took: {llm_time}ms")
+        except Exception as e:
+            print("LLM stream error:", e)
 
-    execution_time = round(time.time() - start_time, 2)
-    print(f"TOTAL EXECUTION TIME: {execution_time} seconds")
+    # The final event carries the authoritative answer (template if the LLM failed)
+    response_text = "".join(chunks).strip()
+    llm_answered = len(response_text) >= 10
+    if not llm_answered:
+        response_text = template_response(ctx)
 
-    return {
-        "computed": {
-            "sum": round(aggregates['sum'], 2),
-            "mean": round(aggregates['mean'], 2),
-            "min": round(aggregates['min'], 2),
-            "max": round(aggregates['max'], 2),
-            "count": aggregates['count'],
-            "date_type": date_type,
-            "daily_breakdown": daily_breakdown if date_type == 'range' else None,
-            "operation_requested": operation,
-            "operation_result": round(op_result, 2) if op_result is not None and isinstance(op_result, (int, float)) else None,
-            "operation_explanation": op_explanation
-        },
-        "rows": rows_preview,
+    execution_time, performance = build_performance(ctx, USE_DATABASE)
+    performance.update(llm_ms=llm_time, mode=mode, llm_called=use_llm)
+    mode_latency.record(mode, (time.time() - ctx['start_time']) * 1000, llm_called=use_llm)
+    if llm_answered or not use_llm:
+        answer_cache.set(cache_key, {"computed": build_computed(ctx), "rows": ctx['rows_preview'], "response": response_text})
+    yield sse_event("done", {
         "response": response_text,
-        "debug": debug_info,
         "execution_time": f"{execution_time} secondes",
-        "performance": {
-            "database_query_ms": query_time if USE_DATABASE else None,
-            "total_ms": round(execution_time * 1000, 2)
-        }
-    }
+        "performance": performance
+    })
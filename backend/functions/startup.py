@@ -0,0 +1,20 @@
+import time
+from contextlib import contextmanager
+
+# Per-phase startup timings in milliseconds, in the order they ran
+startup_timings = {}
+
+def record_phase(name, started_at):
+    startup_timings[name] = round((time.perf_counter() - started_at) * 1000, 2)
+    print(f"Startup phase '{name}': {startup_timings[name]}ms")
+
+@contextmanager
+def timed_phase(name):
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, started_at)
+
+def startup_report():
+    return {**startup_timings, "total_ms": round(sum(startup_timings.values()), 2)}
@@ -1,15 +1,26 @@
+import time 
+_import_start = time.perf_counter()
 import os
 import sys
+import threading
+from typing import List
+from contextlib import asynccontextmanager
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-import time 
-from Database.database import initialize_data_source
-from functions.query_execute import query_exact, Question
+from fastapi.responses import StreamingResponse
+from Database.database import get_data_source, configure_data_source, data_source_ready, refresh_data_source
+from Models.model import get_llm
+from functions.startup import timed_phase, record_phase, startup_report
+from functions.query_execute import query_exact, query_exact_stream, Question
+from functions.batch import query_batch
+from functions.detections import reload_aliases
 from dotenv import load_dotenv
 from backend.Requests.validation import validate_data
 from backend.Requests.health import check
+from backend.Requests.stats import collect
 load_dotenv()
+record_phase("imports", _import_start)
 
 # FIX: Properly convert environment variables to boolean
 def str_to_bool(value):
@@ -20,12 +31,35 @@ def str_to_bool(value):
 
 USE_DATABASE = str_to_bool(os.getenv("USE_DATABASE", "True"))  # Default to True
 AGGREGATION_STRATEGY = os.getenv("AGGREGATION_STRATEGY", "hybrid")  # Default to hybrid
+FAST_STARTUP = str_to_bool(os.getenv("FAST_STARTUP", "False"))  # Bind first, load data/LLM in background
 
 print(f"DEBUG: USE_DATABASE = {USE_DATABASE} (type: {type(USE_DATABASE)})")
 print(f"DEBUG: AGGREGATION_STRATEGY = {AGGREGATION_STRATEGY}")
 
-available_families, df_data = initialize_data_source(USE_DATABASE=USE_DATABASE)
-app = FastAPI()
+configure_data_source(USE_DATABASE)
+
+# -----------------------
+# Startup: data source, validation, LLM client
+# -----------------------
+def warm_up():
+    with timed_phase("data_source"):
+        data_source = get_data_source()
+    with timed_phase("validation"):
+        validate_data(USE_DATABASE=USE_DATABASE, store=data_source.store, available_families=data_source.available_families)
+    with timed_phase("llm_init"):
+        get_llm()
+    print(f"Startup timing breakdown: {startup_report()}")
+
+@asynccontextmanager
+async def lifespan(app):
+    if FAST_STARTUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+
+if not FAST_STARTUP:
+    warm_up()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS — adapte si besoin
 app.add_middleware(
@@ -56,14 +90,43 @@ async def log_requests(request: Request, call_next):
 async def query_execution(q: Question):
     return await query_exact(q, USE_DATABASE=USE_DATABASE, AGGREGATION_STRATEGY=AGGREGATION_STRATEGY)
 
+@app.post("/query/stream")
+async def query_stream(q: Question):
+    return StreamingResponse(
+        query_exact_stream(q, USE_DATABASE=USE_DATABASE, AGGREGATION_STRATEGY=AGGREGATION_STRATEGY),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/query/batch")
+async def query_batch_execution(questions: List[Question]):
+    return await query_batch(questions, USE_DATABASE=USE_DATABASE, AGGREGATION_STRATEGY=AGGREGATION_STRATEGY)
+
+@app.post("/aliases/reload")
+def aliases_reload():
+    return {"aliases": reload_aliases(force=True)}
+
+@app.post("/ingest")
+def ingest():
+    # Picks up a new extract without a restart; stale index, answers and families are dropped
+    return refresh_data_source()
+
 # -----------------------
 # Validation & Health Check
 # -----------------------
 @app.get("/health")
-async def health_check():
-    return check(USE_DATABASE=USE_DATABASE)
+def health_check():
+    # Sync handler: FastAPI runs it in its own threadpool, away from busy /query stages
+    if not data_source_ready():
+        # FAST_STARTUP warm-up still loading: answer now instead of waiting on the data-source lock
+        return {"status": "starting", "database": "sqlite" if USE_DATABASE else "pandas"}
+    # Only the pandas mode reads from the store; the database mode counts rows in SQLite
+    store = None if USE_DATABASE else get_data_source().store
+    return check(USE_DATABASE=USE_DATABASE, store=store)
 
-validate_data(USE_DATABASE=USE_DATABASE, df_data=df_data, available_families=available_families)
+@app.get("/stats")
+async def stats():
+    return collect(USE_DATABASE=USE_DATABASE)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other as top-level packages (functions, Database, ...) from backend/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import re
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import Database.database as database
+from Database.database import DataSource, read_daily_spans
+from Database.ingest import bulk_load
+from Database.pool import ConnectionPool
+from functions.batch import query_batch
+from functions.query_execute import Question, answer_cache, query_exact
+
+FAMILLES = ['BLE FOURRAGER', 'MAIS', 'ORGE']
+FIRST_DAY = date(2024, 1, 1)
+DAYS = 600
+
+
+def same_numbers(a, b):
+    """Equal up to the 2-decimal rounding of sums that were added up in a different order"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_numbers(a[k], b[k]) for k in a)
+    if isinstance(a, float) and isinstance(b, float):
+        return a == pytest.approx(b, abs=0.011)
+    return a == b
+
+
+def masked(text):
+    return re.sub(r"\d+\.\d{2}", "#", text)
+
+
+@pytest.fixture(scope='module')
+def db_path(tmp_path_factory):
+    rng = random.Random(7)
+    rows = []
+    for offset in range(DAYS):
+        day = FIRST_DAY + timedelta(days=offset)
+        for famille in FAMILLES:
+            for _ in range(rng.randint(0, 3)):
+                rows.append((day, famille, famille, round(rng.uniform(1, 500), 3)))
+    df = pd.DataFrame(rows, columns=['DATE_CONSO', 'FAMILLE_NORM', 'FAMILLE', 'QTE'])
+    path = tmp_path_factory.mktemp('batch') / 'consumption.db'
+    conn = sqlite3.connect(path)
+    bulk_load(conn, df)
+    conn.close()
+    return path
+
+
+@pytest.fixture(params=[False, True], ids=['sql', 'prefix-index'])
+def data_source(request, db_path, monkeypatch):
+    """Process-wide data source pointed at the test database, with or without the prefix index"""
+    monkeypatch.setattr(database, '_pool', ConnectionPool(str(db_path)))
+    monkeypatch.setattr(database, '_data_source', DataSource(True, list(FAMILLES), None))
+    monkeypatch.setattr(database, 'USE_PREFIX_INDEX', request.param)
+    monkeypatch.setattr(database, '_prefix_index', None)
+    answer_cache.invalidate()
+    yield
+    answer_cache.invalidate()
+
+
+def test_read_daily_spans_past_the_compound_select_limit(db_path):
+    # 540 disjoint single-day spans: more terms than one compound SELECT may hold
+    spans = {famille: [] for famille in FAMILLES}
+    for i in range(540):
+        day = FIRST_DAY + timedelta(days=2 * (i // 3))
+        spans[FAMILLES[i % 3]].append((day, day))
+
+    conn = sqlite3.connect(db_path)
+    rows = read_daily_spans(conn, spans)
+    expected = [
+        row
+        for famille in sorted(spans)
+        for day, _ in spans[famille]
+        for row in conn.execute(
+            'SELECT famille_norm, date_conso, qte_sum, qte_count, qte_min, qte_max '
+            'FROM daily_consumption WHERE famille_norm = ? AND date_conso = ?', (famille, day.isoformat())
+        )
+    ]
+    assert rows == expected
+
+
+def test_batch_answers_match_single_queries_in_order(data_source):
+    # 540 single days no two of which merge (more spans than one compound SELECT may hold),
+    # ranges further on, a comparison and an unparsable question, all shuffled
+    rng = random.Random(31)
+    questions = []
+    for i in range(540):
+        day = FIRST_DAY + timedelta(days=2 * (i // 3))
+        questions.append(Question(question=f"consommation de {FAMILLES[i % 3]} le {day:%d/%m/%Y}", mode='server'))
+    for _ in range(30):
+        start = FIRST_DAY + timedelta(days=rng.randint(400, DAYS + 10))
+        end = start + timedelta(days=rng.randint(1, 200))
+        text = f"consommation de {rng.choice(FAMILLES)} du {start:%d/%m/%Y} au {end:%d/%m/%Y}"
+        questions.append(Question(question=text, mode='server'))
+    questions.append(Question(question="consommation de MAIS et ORGE du 01/02/2025 au 15/03/2025", mode='server'))
+    questions.append(Question(question="consommation le 01/02/2024", mode='server'))
+    rng.shuffle(questions)
+
+    batch = asyncio.run(query_batch(questions, USE_DATABASE=True, AGGREGATION_STRATEGY='server'))
+    assert batch['performance']['questions'] == len(questions)
+
+    answer_cache.invalidate()
+    for q, result in zip(questions, batch['results']):
+        single = asyncio.run(query_exact(q, USE_DATABASE=True, AGGREGATION_STRATEGY='server'))
+        answer_cache.invalidate()
+        assert masked(result['response']) == masked(single['response'])
+        assert same_numbers(result.get('computed'), single.get('computed'))
@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+from functions.famille_matcher import FamilleMatcher
+from functions.normalize_text import normalize_text
+
+FAMILLES = ['BLE FOURRAGER', 'GRAINES DE SOJA', 'MAIS', 'ORGE']
+ALIAS_FILE = os.path.join(os.path.dirname(__file__), '..', 'famille_aliases.json')
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    with open(ALIAS_FILE, encoding='utf-8') as f:
+        aliases = list(json.load(f).items())
+    return FamilleMatcher(FAMILLES, aliases)
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("consommation de MAIS pour l organisation du 01/06/2024", ['MAIS']),
+    ("ORGE pour la maison", ['ORGE']),
+    ("CORNE et orge", ['ORGE']),
+    ("maïs vs orge", ['MAIS', 'ORGE']),
+    ("corn et soja", ['MAIS', 'GRAINES DE SOJA']),
+    ("blé fourrager, orge et maïs", ['BLE FOURRAGER', 'ORGE', 'MAIS']),
+])
+def test_find_all_counts_whole_words_only(matcher, question, expected):
+    assert matcher.find_all(normalize_text(question)) == expected
+
+
+# -----------------------
+# Differential check against the original linear scan
+# -----------------------
+
+def legacy_detect_famille(text, families, aliases):
+    """detect_famille_in_text as it was before the compiled matcher"""
+    import difflib
+    import re
+    text_norm = normalize_text(text)
+    variations = {normalize_text(variant): normalize_text(standard) for variant, standard in aliases}
+    for variant, standard in variations.items():
+        if variant in text_norm:
+            return standard
+    for fam in families:
+        if fam == text_norm or fam in text_norm:
+            return fam
+    matches = difflib.get_close_matches(text_norm, families, n=1, cutoff=0.8)
+    if matches:
+        return matches[0]
+    words = [w for w in re.split(r'[\s,;:.!?()]+', text_norm) if len(w) > 2]
+    for w in words:
+        matches = difflib.get_close_matches(w, families, n=1, cutoff=0.85)
+        if matches:
+            return matches[0]
+    return None
+
+
+def test_match_agrees_with_legacy_scan():
+    import random
+    rng = random.Random(13)
+    letters = 'ABCDEFGHIJKLMNOPRSTUV'
+    words = [''.join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(150)]
+    families = sorted({' '.join(rng.sample(words, rng.randint(1, 3))) for _ in range(300)}) + FAMILLES
+    with open(ALIAS_FILE, encoding='utf-8') as f:
+        aliases = list(json.load(f).items())
+    matcher = FamilleMatcher(families, aliases)
+
+    def typo(name):
+        pos = rng.randrange(len(name))
+        return name[:pos] + rng.choice(letters) + name[pos + 1:]
+
+    questions = []
+    for _ in range(300):
+        kind = rng.randrange(5)
+        if kind == 0:
+            subject = rng.choice(families).lower()
+        elif kind == 1:
+            subject = typo(rng.choice(families))
+        elif kind == 2:
+            subject = rng.choice(aliases)[0]
+        elif kind == 3:
+            subject = ' '.join(rng.sample(words, 2))
+        else:
+            subject = rng.choice(families) + ' et ' + rng.choice(families)
+        questions.append(f"consommation {subject} du 01/06/2024 au 30/06/2024")
+    questions.append("")
+
+    for question in questions:
+        assert matcher.match(normalize_text(question)) == legacy_detect_famille(question, families, aliases), question
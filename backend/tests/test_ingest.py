@@ -0,0 +1,86 @@
+import random
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+from Database.database import setup_sqlite_database
+from Database.ingest import bulk_load, incremental_load
+
+FAMILLES = ['BLE FOURRAGER', 'MAIS', 'ORGE']
+TABLES = {
+    'consumption': 'SELECT date_conso, famille_norm, qte FROM consumption ORDER BY date_conso, famille_norm, qte',
+    'daily_consumption': 'SELECT * FROM daily_consumption ORDER BY famille_norm, date_conso',
+    'monthly_consumption': 'SELECT * FROM monthly_consumption ORDER BY famille_norm, month',
+}
+
+
+def make_rows(first_day, days, seed):
+    rng = random.Random(seed)
+    rows = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for famille in FAMILLES:
+            for _ in range(rng.randint(0, 3)):
+                rows.append((day, famille, famille, round(rng.uniform(1, 500), 3)))
+    return pd.DataFrame(rows, columns=['DATE_CONSO', 'FAMILLE_NORM', 'FAMILLE', 'QTE'])
+
+
+def snapshot(conn):
+    return {table: [tuple(round(v, 6) if isinstance(v, float) else v for v in row) for row in conn.execute(sql)]
+            for table, sql in TABLES.items()}
+
+
+def test_incremental_load_matches_a_full_rebuild(tmp_path):
+    # The first extract stops part-way through its last day; the next one repeats that day in full
+    watermark = date(2024, 3, 10)
+    old = make_rows(date(2023, 12, 1), 101, seed=1)
+    new = make_rows(date(2024, 2, 20), 60, seed=2)
+    first = pd.concat([old[old['DATE_CONSO'] < watermark], new[new['DATE_CONSO'] == watermark].head(2)])
+
+    incremental = sqlite3.connect(tmp_path / 'incremental.db')
+    bulk_load(incremental, first)
+    inserted, first_date = incremental_load(incremental, [new.iloc[:70], new.iloc[70:]])
+
+    expected = pd.concat([old[old['DATE_CONSO'] < watermark], new[new['DATE_CONSO'] >= watermark]])
+    assert (inserted, first_date) == ((new['DATE_CONSO'] >= watermark).sum(), watermark.isoformat())
+
+    rebuilt = sqlite3.connect(tmp_path / 'rebuilt.db')
+    bulk_load(rebuilt, expected)
+    assert snapshot(incremental) == snapshot(rebuilt)
+
+
+def test_incremental_load_with_nothing_new_leaves_the_data_alone(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'consumption.db')
+    rows = make_rows(date(2024, 1, 1), 40, seed=3)
+    bulk_load(conn, rows)
+    before = snapshot(conn)
+    stale = rows[rows['DATE_CONSO'] < date(2024, 2, 1)]
+    assert incremental_load(conn, stale) == (0, None)
+    assert snapshot(conn) == before
+
+
+def test_concurrent_workers_load_a_new_extract_once(tmp_path):
+    parquet = tmp_path / 'extract.parquet'
+    database = str(tmp_path / 'consumption.db')
+    columns = ['DATE_CONSO', 'FAMILLE', 'QTE']
+    make_rows(date(2024, 1, 1), 60, seed=4)[columns].to_parquet(parquet)
+    setup_sqlite_database(PARQUET_FILE=str(parquet), EXCEL_FILE=None, SQLITE_DB=database)
+
+    extract = make_rows(date(2024, 1, 1), 120, seed=4)
+    extract[columns].to_parquet(parquet)
+    workers = [
+        threading.Thread(target=setup_sqlite_database, kwargs={
+            'PARQUET_FILE': str(parquet), 'EXCEL_FILE': None, 'SQLITE_DB': database, 'incremental': True
+        })
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    conn = sqlite3.connect(database)
+    assert conn.execute('SELECT COUNT(*) FROM consumption').fetchone()[0] == len(extract)
+    assert conn.execute('SELECT SUM(qte_count) FROM daily_consumption').fetchone()[0] == len(extract)
@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from functions.load_data import ParquetCache
+
+
+def chunk(rows, qte):
+    return pd.DataFrame({
+        'DATE_CONSO': [date(2024, 1, 1) + timedelta(days=i) for i in range(rows)],
+        'FAMILLE': ['MAIS'] * rows,
+        'QTE': [float(qte)] * rows,
+    })
+
+
+def test_concurrent_parquet_caches_never_publish_a_mixed_file(tmp_path):
+    path = str(tmp_path / 'extract.parquet')
+
+    def write(worker):
+        cache = ParquetCache(path)
+        for _ in range(5):
+            cache.write(chunk(200 + worker, worker))
+            time.sleep(0.01)
+        cache.close(keep=True)
+
+    workers = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    # Whole output of exactly one worker, and no temp file left behind
+    published = pd.read_parquet(path)
+    worker = int(published['QTE'].iloc[0])
+    assert len(published) == 5 * (200 + worker)
+    assert (published['QTE'] == worker).all()
+    assert os.listdir(tmp_path) == ['extract.parquet']
+
+
+def test_abandoned_parquet_cache_leaves_nothing(tmp_path):
+    path = tmp_path / 'extract.parquet'
+    unused = ParquetCache(str(path))
+    unused.close(keep=False)
+    partial = ParquetCache(str(path))
+    partial.write(chunk(10, 1))
+    partial.close(keep=False)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,80 @@
+import json
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Database.memory_store import ColumnStore
+
+FAMILLES = ['ORGE', 'BLE FOURRAGER', 'MAIS', 'GRAINES DE SOJA']
+SIGNATURE = 'extract.parquet=1:100'
+
+
+@pytest.fixture(scope='module')
+def frame():
+    # Unsorted rows, familles first seen in different chunks, one famille with a single row
+    rng = random.Random(13)
+    rows = []
+    for _ in range(6000):
+        day = date(2023, 1, 1) + timedelta(days=rng.randint(0, 500))
+        rows.append((day, rng.choice(FAMILLES[:3]), round(rng.uniform(-10, 900), 3)))
+    rows.append((date(2023, 6, 1), 'GRAINES DE SOJA', 12.5))
+    return pd.DataFrame(rows, columns=['DATE_CONSO', 'FAMILLE_NORM', 'QTE'])
+
+
+def chunks(frame, size=1700):
+    return (frame.iloc[start:start + size] for start in range(0, len(frame), size))
+
+
+def pandas_numbers(frame, famille, start, end, granularity):
+    rows = frame[(frame['FAMILLE_NORM'] == famille) & (frame['DATE_CONSO'] >= start) & (frame['DATE_CONSO'] <= end)]
+    keys = rows['DATE_CONSO'].map(lambda d: d.isoformat()[:7] if granularity == 'month' else d.isoformat())
+    grouped = rows.groupby(keys)['QTE'].agg(['sum', 'count']).sort_index()
+    return rows, list(zip(grouped.index, grouped['sum'], grouped['count']))
+
+
+def test_snapshot_round_trip_matches_pandas(frame, tmp_path):
+    built = ColumnStore.from_chunks(chunks(frame))
+    built.save(tmp_path, SIGNATURE)
+    loaded = ColumnStore.load(tmp_path, SIGNATURE)
+
+    assert loaded is not None
+    assert isinstance(loaded.qte, np.memmap)
+    assert loaded.familles == built.familles == sorted(FAMILLES)
+    for name in ('offsets', 'famille_codes', 'dates', 'qte'):
+        assert np.array_equal(getattr(loaded, name), getattr(built, name))
+
+    rng = random.Random(3)
+    for _ in range(80):
+        start = date(2022, 12, 1) + timedelta(days=rng.randint(0, 520))
+        end = start + timedelta(days=rng.randint(0, 200))
+        granularity = rng.choice(['day', 'month'])
+        for famille in FAMILLES:
+            rows, groups = pandas_numbers(frame, famille, start, end, granularity)
+            values = rows['QTE']
+            got = loaded.aggregates(famille, start, end)
+            assert got['count'] == len(values)
+            if len(values):
+                assert got['sum'] == pytest.approx(values.sum())
+                assert (got['min'], got['max']) == (values.min(), values.max())
+            breakdown = loaded.breakdown(famille, start, end, granularity)
+            assert [(row['period'], row['entries']) for row in breakdown] == [(p, c) for p, _, c in groups]
+            assert [row['total'] for row in breakdown] == pytest.approx([t for _, t, _ in groups])
+            sample = loaded.sample_rows(famille, start, end, limit=5)
+            assert [row['DATE_CONSO'] for row in sample] == sorted(d.isoformat() for d in rows['DATE_CONSO'])[:5]
+
+
+def test_stale_or_damaged_snapshot_is_not_loaded(frame, tmp_path):
+    ColumnStore.from_chunks(chunks(frame)).save(tmp_path, SIGNATURE)
+    assert ColumnStore.load(tmp_path, 'extract.parquet=2:100') is None
+
+    meta_path = tmp_path / 'meta.json'
+    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    meta_path.write_text(json.dumps({**meta, 'rows': meta['rows'] + 1}), encoding='utf-8')
+    assert ColumnStore.load(tmp_path, SIGNATURE) is None
+
+    meta_path.write_text('{"version": 1, "sig', encoding='utf-8')
+    assert ColumnStore.load(tmp_path, SIGNATURE) is None
+    assert ColumnStore.load(tmp_path / 'missing', SIGNATURE) is None
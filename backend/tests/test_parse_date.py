@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+from functions.parse_date import parse_date_range_from_text
+
+TODAY = date(2026, 10, 16)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("du 1er juin au 15 juin 2024", (date(2024, 6, 1), date(2024, 6, 15), 'range')),
+    ("entre le 1er et le 15 juin 2024", (date(2024, 6, 1), date(2024, 6, 15), 'range')),
+    ("du 28 décembre 2023 au 3 janvier", (date(2023, 12, 28), date(2024, 1, 3), 'range')),
+    ("de janvier à mars 2024", (date(2024, 1, 1), date(2024, 3, 31), 'range')),
+    ("entre mai et juin 2024", (date(2024, 5, 1), date(2024, 6, 30), 'range')),
+    ("de novembre à janvier", (date(2025, 11, 1), date(2026, 1, 31), 'range')),
+    ("le 15 mars 2024", (date(2024, 3, 15), date(2024, 3, 15), 'single')),
+    ("le 20 décembre", (date(2025, 12, 20), date(2025, 12, 20), 'single')),
+])
+def test_written_dates(text, expected):
+    assert parse_date_range_from_text(f"consommation MAIS {text}", today=TODAY) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("en juin 2024", (date(2024, 6, 1), date(2024, 6, 30), 'range')),
+    ("mois de juin", (date(2026, 6, 1), date(2026, 6, 30), 'range')),
+    ("juin de cette année", (date(2026, 6, 1), date(2026, 6, 30), 'range')),
+    ("T2 2024", (date(2024, 4, 1), date(2024, 6, 30), 'range')),
+    ("hier", (date(2026, 10, 15), date(2026, 10, 15), 'single')),
+    ("du 01/06/2024 au 30/06/2024", (date(2024, 6, 1), date(2024, 6, 30), 'range')),
+])
+def test_calendar_and_numeric_dates(text, expected):
+    assert parse_date_range_from_text(f"consommation MAIS {text}", today=TODAY) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "en janvier et mars 2024",
+    "le 31 février 2024",
+    "sans date",
+])
+def test_ambiguous_or_invalid_dates_are_not_guessed(text):
+    assert parse_date_range_from_text(f"consommation MAIS {text}", today=TODAY) == (None, None, None)
@@ -0,0 +1,67 @@
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from Database.ingest import bulk_load
+from Database.prefix_index import PrefixSumIndex
+
+FAMILLES = ['BLE FOURRAGER', 'MAIS', 'ORGE']
+
+
+@pytest.fixture(scope='module')
+def conn(tmp_path_factory):
+    # Sparse days and a famille that starts late, so ranges hit gaps and both edges
+    rng = random.Random(11)
+    rows = []
+    for offset in range(700):
+        day = date(2023, 1, 1) + timedelta(days=offset)
+        for famille in FAMILLES:
+            if famille == 'ORGE' and offset < 200:
+                continue
+            for _ in range(rng.choice([0, 0, 1, 2, 4])):
+                rows.append((day, famille, famille, round(rng.uniform(-20, 500), 3)))
+    df = pd.DataFrame(rows, columns=['DATE_CONSO', 'FAMILLE_NORM', 'FAMILLE', 'QTE'])
+    connection = sqlite3.connect(tmp_path_factory.mktemp('prefix') / 'consumption.db')
+    bulk_load(connection, df)
+    yield connection
+    connection.close()
+
+
+def sql_numbers(conn, famille, start, end, granularity):
+    period = 'substr(date_conso, 1, 7)' if granularity == 'month' else 'date_conso'
+    params = (famille, start.isoformat(), end.isoformat())
+    aggregates = conn.execute(
+        'SELECT SUM(qte), COUNT(*), MIN(qte), MAX(qte) FROM consumption '
+        'WHERE famille_norm = ? AND date_conso BETWEEN ? AND ?', params
+    ).fetchone()
+    breakdown = conn.execute(
+        f'SELECT {period}, SUM(qte), COUNT(*) FROM consumption '
+        f'WHERE famille_norm = ? AND date_conso BETWEEN ? AND ? GROUP BY {period} ORDER BY {period}', params
+    ).fetchall()
+    return aggregates, breakdown
+
+
+@pytest.mark.parametrize("granularity", ['day', 'month'])
+def test_prefix_index_matches_sql(conn, granularity):
+    index = PrefixSumIndex.from_sqlite(conn)
+    rng = random.Random(29)
+    for _ in range(300):
+        start = date(2022, 11, 1) + timedelta(days=rng.randint(0, 800))
+        end = start + timedelta(days=rng.randint(0, 400))
+        for famille in FAMILLES:
+            (total, count, low, high), rows = sql_numbers(conn, famille, start, end, granularity)
+            got = index.aggregates(famille, start, end)
+            assert got['count'] == count
+            if count:
+                assert got['sum'] == pytest.approx(total)
+                assert got['mean'] == pytest.approx(total / count)
+                assert (got['min'], got['max']) == (pytest.approx(low), pytest.approx(high))
+            else:
+                assert got == {'sum': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0}
+            breakdown = index.breakdown(famille, start, end, granularity)
+            assert [row['period'] for row in breakdown] == [row[0] for row in rows]
+            assert [row['entries'] for row in breakdown] == [row[2] for row in rows]
+            assert [row['total'] for row in breakdown] == pytest.approx([row[1] for row in rows])
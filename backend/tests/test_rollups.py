@@ -0,0 +1,78 @@
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from Database.database import rollup_numbers
+from Database.ingest import bulk_load
+from Database.planner import plan_range
+
+FAMILLES = ['BLE FOURRAGER', 'MAIS', 'ORGE']
+
+
+def day_keys(tier, lo, hi):
+    """Every day covered by one plan_range segment"""
+    if tier == 'month':
+        first = date.fromisoformat(f"{lo}-01")
+        nxt = date.fromisoformat(f"{hi}-01") + timedelta(days=31)
+        last = nxt.replace(day=1) - timedelta(days=1)
+    else:
+        first, last = date.fromisoformat(lo), date.fromisoformat(hi)
+    return first, last
+
+
+def test_plan_range_covers_exactly_the_range():
+    rng = random.Random(17)
+    for _ in range(2000):
+        start = date(2019, 1, 1) + timedelta(days=rng.randint(0, 2000))
+        end = start + timedelta(days=rng.randint(0, 1200))
+        expected = start
+        for tier, lo, hi in plan_range(start, end):
+            assert tier in ('month', 'day')
+            first, last = day_keys(tier, lo, hi)
+            assert first == expected
+            expected = last + timedelta(days=1)
+        assert expected == end + timedelta(days=1)
+
+
+@pytest.fixture(scope='module')
+def conn(tmp_path_factory):
+    rng = random.Random(5)
+    rows = []
+    for offset in range(0, 1100):
+        day = date(2022, 11, 20) + timedelta(days=offset)
+        for famille in FAMILLES:
+            for _ in range(rng.randint(0, 3)):
+                rows.append((day, famille, famille, round(rng.uniform(1, 500), 3)))
+    df = pd.DataFrame(rows, columns=['DATE_CONSO', 'FAMILLE_NORM', 'FAMILLE', 'QTE'])
+    connection = sqlite3.connect(tmp_path_factory.mktemp('rollups') / 'consumption.db')
+    bulk_load(connection, df)
+    yield connection
+    connection.close()
+
+
+@pytest.mark.parametrize("granularity", ['day', 'month'])
+def test_rollup_numbers_match_daily_sum(conn, granularity):
+    rng = random.Random(23)
+    for _ in range(150):
+        start = date(2022, 11, 1) + timedelta(days=rng.randint(0, 1100))
+        end = start + timedelta(days=rng.randint(0, 800))
+        aggregates, breakdown = rollup_numbers(conn, start, end, None, granularity)
+        for famille in FAMILLES:
+            total, count, low, high = conn.execute(
+                'SELECT SUM(qte), COUNT(*), MIN(qte), MAX(qte) FROM consumption '
+                'WHERE famille_norm = ? AND date_conso BETWEEN ? AND ?',
+                (famille, start.isoformat(), end.isoformat())
+            ).fetchone()
+            if not count:
+                assert famille not in aggregates
+                continue
+            got = aggregates[famille]
+            assert got['count'] == count
+            assert got['sum'] == pytest.approx(total)
+            assert got['mean'] == pytest.approx(total / count)
+            assert (got['min'], got['max']) == (pytest.approx(low), pytest.approx(high))
+            assert sum(row['total'] for row in breakdown[famille]) == pytest.approx(total)
+            assert sum(row['entries'] for row in breakdown[famille]) == count
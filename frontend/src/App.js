@@ -45,10 +45,43 @@ function App() {
       title: ''
     };
 
-    if (hasDaily && dateType === 'range') {
+    if (computed.familles) {
+      // Multi-famille comparison table
+      tableData.title = 'Comparaison par famille';
+      tableData.headers = ['Famille', 'Consommation (unités)', 'Nombre d\'entrées', 'Moyenne'];
+
+      Object.entries(computed.familles)
+        .sort(([, a], [, b]) => b.sum - a.sum)
+        .forEach(([famille, stats]) => {
+          tableData.rows.push([
+            famille,
+            formatNumberFR(stats.sum),
+            stats.count.toString(),
+            formatNumberFR(stats.mean)
+          ]);
+        });
+
+      tableData.rows.push([
+        'TOTAL',
+        formatNumberFR(computed.sum),
+        computed.count.toString(),
+        formatNumberFR(computed.mean)
+      ]);
+
+      if (hasOperation) {
+        tableData.rows.push([
+          computed.operation_explanation || 'Résultat',
+          formatNumberFR(computed.operation_result),
+          '',
+          ''
+        ]);
+      }
+
+    } else if (hasDaily && dateType === 'range') {
       // Daily breakdown table
-      tableData.title = 'Consommation par jour';
-      tableData.headers = ['Date', 'Consommation (unités)', 'Nombre d\'entrées'];
+      const monthly = computed.breakdown_granularity === 'month';
+      tableData.title = monthly ? 'Consommation par mois' : 'Consommation par jour';
+      tableData.headers = [monthly ? 'Mois' : 'Date', 'Consommation (unités)', 'Nombre d\'entrées'];
       
       Object.entries(dailyBreakdown)
         .sort(([a], [b]) => new Date(a.split('/').reverse().join('-')) - new Date(b.split('/').reverse().join('-')))